@@ -6,77 +6,182 @@ Integrate processed Wikipedia chunks into the main documents_metadata.json file
 
 import os
 import sys
-import json
-from typing import List, Dict, Any
+import shutil
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from datetime import datetime
 
+import ijson
+import orjson
+
 # Add project root to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
+from arqa.document_store import shard_directory, iter_documents, count_documents, backup_documents
+
+# Keys describing where existing documents live rather than metadata to write back out
+_STREAMED_KEYS = ('documents', 'documents_path', 'documents_count', 'documents_dir')
+
+def _scan_metadata_file(f) -> Tuple[Dict[str, Any], int]:
+    """Collect top-level metadata fields and count documents in one streaming pass"""
+    
+    header = {}
+    documents_count = 0
+    key, builder = None, None
+    
+    for prefix, event, value in ijson.parse(f, use_float=True):
+        if prefix == '':
+            # A new top-level key (or the closing brace) ends the previous value
+            if event in ('map_key', 'end_map') and builder is not None:
+                header[key] = builder.value
+                builder = None
+            if event == 'map_key':
+                key = value
+                if key != 'documents':
+                    builder = ijson.ObjectBuilder()
+        elif builder is not None:
+            builder.event(event, value)
+        elif prefix == 'documents.item' and event == 'start_map':
+            documents_count += 1
+    
+    return header, documents_count
+
 def load_existing_metadata(metadata_file: str = "documents_metadata.json") -> Dict[str, Any]:
-    """Load existing documents metadata"""
+    """Scan existing documents metadata without loading the documents
+    
+    Returns the top-level metadata fields plus 'documents_path' and
+    'documents_count'; the documents themselves are streamed from
+    'documents_path' when the merged file is written.
+    """
     
     print(f"📁 Loading existing metadata from: {metadata_file}")
     
     try:
-        with open(metadata_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        with open(metadata_file, 'rb') as f:
+            header, documents_count = _scan_metadata_file(f)
+        
+        # Retriever-saved files keep their documents in Parquet shards
+        if 'documents_dir' in header:
+            documents_count = count_documents(metadata_file)
         
-        print(f"   ✅ Loaded {len(data.get('documents', []))} existing documents")
-        return data
+        print(f"   ✅ Found {documents_count} existing documents")
+        return {
+            **header,
+            "documents_path": metadata_file,
+            "documents_count": documents_count
+        }
     except FileNotFoundError:
         print(f"   ⚠️ File not found, creating new metadata structure")
         return {
             "model_name": "abdoelsayed/AraDPR",
-            "documents": []
+            "documents_path": None,
+            "documents_count": 0
         }
     except Exception as e:
         print(f"   ❌ Error loading metadata: {e}")
         return None
 
-def load_wikipedia_chunks(data_dir: str = "wikipedia_test") -> List[Dict[str, Any]]:
-    """Load processed Wikipedia chunks from batch files"""
+def iter_existing_documents(existing_data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Stream existing documents back from the metadata file they were scanned from"""
     
-    print(f"📁 Loading Wikipedia chunks from: {data_dir}")
+    documents_path = existing_data.get('documents_path')
+    if not documents_path:
+        return
+    
+    yield from iter_documents(documents_path)
+
+def list_wikipedia_batch_files(data_dir: str = "wikipedia_test") -> List[Tuple[str, str]]:
+    """List processed Wikipedia batch files as (name, path) pairs in processing order"""
     
     if not os.path.exists(data_dir):
-        print(f"❌ Directory not found: {data_dir}")
         return []
     
-    all_chunks = []
-    batch_files = [f for f in os.listdir(data_dir) if f.startswith('wikipedia_batch_') and f.endswith('.json')]
-    batch_files.sort()
+    # scandir: one directory read with cached file types, and full paths without joining
+    with os.scandir(data_dir) as entries:
+        batch_files = sorted(
+            (entry.name, entry.path) for entry in entries
+            if entry.name.startswith('wikipedia_batch') and entry.name.endswith(('.json', '.jsonl')) and entry.is_file()
+        )
+    return batch_files
+
+def _load_batch_file(batch_path: str) -> List[Dict[str, Any]]:
+    """Read and decode a single Wikipedia batch file (JSON Lines or legacy JSON array)"""
+    
+    data = Path(batch_path).read_bytes()
+    if batch_path.endswith('.jsonl'):
+        return [orjson.loads(line) for line in data.splitlines() if line.strip()]
+    return orjson.loads(data)
+
+def iter_wikipedia_chunks(data_dir: str = "wikipedia_test", max_workers: int = 4) -> Iterator[Dict[str, Any]]:
+    """Stream processed Wikipedia chunks from batch files in order
+    
+    Upcoming batch files are read and decoded on a thread pool while the
+    current one is consumed; at most max_workers files are in flight, so
+    memory stays bounded by a few batches rather than the whole corpus.
+    """
+    
+    print(f"📁 Streaming Wikipedia chunks from: {data_dir}")
+    
+    if not os.path.exists(data_dir):
+        print(f"❌ Directory not found: {data_dir}")
+        return
+    
+    batch_files = list_wikipedia_batch_files(data_dir)
     
     print(f"📦 Found {len(batch_files)} batch files")
     
-    for batch_file in batch_files:
-        batch_path = os.path.join(data_dir, batch_file)
+    total_chunks = 0
+    batch_log = []  # per-file status lines, printed together once streaming finishes
+    remaining = iter(batch_files)
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque(
+            (batch_file, executor.submit(_load_batch_file, batch_path))
+            for batch_file, batch_path in islice(remaining, max_workers)
+        )
         
-        try:
-            with open(batch_path, 'r', encoding='utf-8') as f:
-                batch_data = json.load(f)
-                all_chunks.extend(batch_data)
-                print(f"   ✅ Loaded {len(batch_data)} chunks from {batch_file}")
-        except Exception as e:
-            print(f"   ❌ Error loading {batch_file}: {e}")
+        while pending:
+            batch_file, future = pending.popleft()
+            
+            # Keep the prefetch window full
+            next_file = next(remaining, None)
+            if next_file is not None:
+                next_name, next_path = next_file
+                pending.append((next_name, executor.submit(_load_batch_file, next_path)))
+            
+            try:
+                batch_data = future.result()
+            except Exception as e:
+                batch_log.append(f"   ❌ Error loading {batch_file}: {e}")
+                continue
+            
+            yield from batch_data
+            total_chunks += len(batch_data)
+            batch_log.append(f"   ✅ Loaded {len(batch_data)} chunks from {batch_file}")
     
-    print(f"📄 Total Wikipedia chunks loaded: {len(all_chunks)}")
-    return all_chunks
+    batch_log.append(f"📄 Total Wikipedia chunks streamed: {total_chunks}")
+    print('\n'.join(batch_log))
 
-def convert_wikipedia_to_metadata_format(wikipedia_chunks: List[Dict[str, Any]], start_id: int = 0) -> List[Dict[str, Any]]:
-    """Convert Wikipedia chunks to the metadata format used by ARQA"""
+def convert_wikipedia_to_metadata_format(wikipedia_chunks: Iterable[Dict[str, Any]], start_id: int = 0) -> Iterator[Dict[str, Any]]:
+    """Convert Wikipedia chunks to the metadata format used by ARQA, one document at a time"""
     
-    print(f"🔄 Converting {len(wikipedia_chunks)} Wikipedia chunks to metadata format")
+    print(f"🔄 Converting Wikipedia chunks to metadata format")
     print(f"📊 Starting ID: {start_id}")
     
-    converted_documents = []
+    converted_count = 0
     
-    for i, chunk in enumerate(wikipedia_chunks):
-        doc_id = start_id + i
-        
-        # Extract metadata
-        metadata = chunk.get('metadata', {})
-        title = metadata.get('title', 'Unknown')
+    # One timestamp for the whole import run
+    added_date = datetime.now().isoformat()
+    # Fields already promoted into meta; not repeated in wikipedia_metadata
+    promoted_keys = ('title', 'chunk_id', 'total_chunks')
+    
+    for doc_id, chunk in enumerate(wikipedia_chunks, start_id):
+        # Extract metadata once per chunk
+        metadata = chunk.get('metadata') or {}
+        chunk_id = metadata.get('chunk_id', 0)
         
         # Create the document in ARQA format
         document = {
@@ -84,58 +189,86 @@ def convert_wikipedia_to_metadata_format(wikipedia_chunks: List[Dict[str, Any]],
             "content": chunk.get('content', ''),
             "meta": {
                 "source": "wikipedia",
-                "title": title,
-                "wikipedia_metadata": metadata,
-                "added_date": datetime.now().isoformat(),
-                "chunk_id": metadata.get('chunk_id', 0),
+                "title": metadata.get('title', 'Unknown'),
+                "wikipedia_metadata": {k: v for k, v in metadata.items() if k not in promoted_keys},
+                "added_date": added_date,
+                "chunk_id": chunk_id,
                 "total_chunks": metadata.get('total_chunks', 1)
             },
-            "chunk_id": metadata.get('chunk_id', 0)
+            "chunk_id": chunk_id
         }
         
-        converted_documents.append(document)
+        converted_count += 1
+        yield document
         
-        # Progress indicator
-        if (i + 1) % 1000 == 0:
-            print(f"   📈 Converted {i + 1:,} chunks...")
+        # Progress indicator: a bare counter check per chunk, formatting only on the rare tick
+        if converted_count % 100000 == 0:
+            print(f"   📈 Converted {converted_count:,} chunks...")
     
-    print(f"✅ Conversion complete: {len(converted_documents)} documents ready")
-    return converted_documents
+    print(f"✅ Conversion complete: {converted_count:,} documents ready")
 
-def merge_and_save_metadata(existing_data: Dict[str, Any], new_documents: List[Dict[str, Any]], 
+def _write_documents(f, documents: Iterable[Dict[str, Any]], first: bool) -> int:
+    """Write documents as comma-separated JSON lines, returning how many were written"""
+    
+    count = 0
+    for doc in documents:
+        if not first:
+            f.write(b',\n')
+        f.write(orjson.dumps(doc))
+        first = False
+        count += 1
+    return count
+
+def merge_and_save_metadata(existing_data: Dict[str, Any], new_documents: Iterable[Dict[str, Any]], 
                            output_file: str = "documents_metadata.json", 
-                           backup: bool = True) -> bool:
-    """Merge new Wikipedia documents with existing metadata and save"""
+                           backup: bool = True) -> Optional[int]:
+    """Merge new Wikipedia documents with existing metadata and save
+    
+    Returns the number of new documents written, or None if saving failed.
+    """
     
-    print(f"🔗 Merging {len(new_documents)} new documents with existing metadata")
+    print(f"🔗 Merging new documents with existing metadata")
     
     # Create backup if requested
     if backup and os.path.exists(output_file):
         backup_file = f"{output_file}.backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         try:
-            with open(output_file, 'r', encoding='utf-8') as src:
-                with open(backup_file, 'w', encoding='utf-8') as dst:
-                    dst.write(src.read())
+            # Shards move with the backup, so existing documents are streamed from there
+            backup_documents(output_file, backup_file)
+            existing_data = {**existing_data, "documents_path": backup_file}
             print(f"💾 Backup created: {backup_file}")
         except Exception as e:
             print(f"⚠️ Backup failed: {e}")
     
-    # Merge documents
-    merged_data = existing_data.copy()
-    merged_data['documents'].extend(new_documents)
-    
-    print(f"📊 Total documents after merge: {len(merged_data['documents'])}")
-    
-    # Save merged data
+    # Stream merged documents to a temp file, then swap it in atomically
+    tmp_file = f"{output_file}.tmp"
     try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(merged_data, f, ensure_ascii=False, indent=2)
+        with open(tmp_file, 'wb') as f:
+            f.write(b'{')
+            for key, value in existing_data.items():
+                if key not in _STREAMED_KEYS:
+                    f.write(orjson.dumps(key) + b': ' + orjson.dumps(value) + b', ')
+            f.write(b'"documents": [\n')
+            
+            existing_count = _write_documents(f, iter_existing_documents(existing_data), first=True)
+            added_count = _write_documents(f, new_documents, first=existing_count == 0)
+            
+            f.write(b'\n]}\n')
         
+        os.replace(tmp_file, output_file)
+        
+        # The merged file holds every document itself; drop shards it replaced
+        if os.path.isdir(shard_directory(output_file)):
+            shutil.rmtree(shard_directory(output_file))
+        
+        print(f"📊 Total documents after merge: {existing_count + added_count}")
         print(f"✅ Successfully saved to: {output_file}")
-        return True
+        return added_count
     except Exception as e:
         print(f"❌ Error saving metadata: {e}")
-        return False
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        return None
 
 def validate_merged_metadata(metadata_file: str = "documents_metadata.json") -> bool:
     """Validate the merged metadata file"""
@@ -143,30 +276,35 @@ def validate_merged_metadata(metadata_file: str = "documents_metadata.json") ->
     print(f"🔍 Validating merged metadata: {metadata_file}")
     
     try:
-        with open(metadata_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # Single streaming pass: track seen IDs and counters, never the document list
+        seen_ids = set()
+        total_docs = 0
+        duplicate_ids = 0
+        wikipedia_docs = 0
+        empty_content = 0
         
-        documents = data.get('documents', [])
-        total_docs = len(documents)
-        
-        # Check for duplicates
-        doc_ids = [doc['id'] for doc in documents]
-        unique_ids = set(doc_ids)
-        
-        # Count Wikipedia documents
-        wikipedia_docs = [doc for doc in documents if doc.get('meta', {}).get('source') == 'wikipedia']
+        for doc in iter_documents(metadata_file):
+            total_docs += 1
+            
+            doc_id = doc['id']
+            if doc_id in seen_ids:
+                duplicate_ids += 1
+            else:
+                seen_ids.add(doc_id)
+            
+            if doc.get('meta', {}).get('source') == 'wikipedia':
+                wikipedia_docs += 1
+            if not doc.get('content', '').strip():
+                empty_content += 1
         
         print(f"📊 Validation Results:")
         print(f"   📄 Total documents: {total_docs:,}")
-        print(f"   🆔 Unique IDs: {len(unique_ids):,}")
-        print(f"   📚 Wikipedia documents: {len(wikipedia_docs):,}")
-        print(f"   ✅ No ID duplicates: {len(unique_ids) == total_docs}")
-        
-        # Check content validity
-        empty_content = [doc for doc in documents if not doc.get('content', '').strip()]
-        print(f"   📝 Documents with empty content: {len(empty_content)}")
+        print(f"   🆔 Unique IDs: {len(seen_ids):,}")
+        print(f"   📚 Wikipedia documents: {wikipedia_docs:,}")
+        print(f"   ✅ No ID duplicates: {duplicate_ids == 0}")
+        print(f"   📝 Documents with empty content: {empty_content}")
         
-        if len(unique_ids) == total_docs and len(empty_content) == 0:
+        if duplicate_ids == 0 and empty_content == 0:
             print("✅ Validation passed!")
             return True
         else:
@@ -184,14 +322,26 @@ def show_statistics(metadata_file: str = "documents_metadata.json"):
     print("=" * 50)
     
     try:
-        with open(metadata_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # Aggregate everything in one streaming pass over the documents
+        total_docs = 0
+        total_content_length = 0
+        sources = Counter()
+        wikipedia_docs = 0
+        wiki_titles = set()
         
-        documents = data.get('documents', [])
+        for doc in iter_documents(metadata_file):
+            meta = doc.get('meta', {})
+            source = meta.get('source', 'unknown')
+            
+            total_docs += 1
+            total_content_length += len(doc.get('content', ''))
+            sources[source] += 1
+            
+            if source == 'wikipedia':
+                wikipedia_docs += 1
+                wiki_titles.add(meta.get('title', 'Unknown'))
         
         # Overall stats
-        total_docs = len(documents)
-        total_content_length = sum(len(doc.get('content', '')) for doc in documents)
         avg_length = total_content_length / total_docs if total_docs > 0 else 0
         
         print(f"📄 Total Documents: {total_docs:,}")
@@ -199,24 +349,17 @@ def show_statistics(metadata_file: str = "documents_metadata.json"):
         print(f"📈 Average Document Length: {avg_length:.1f} characters")
         
         # Source breakdown
-        sources = {}
-        for doc in documents:
-            source = doc.get('meta', {}).get('source', 'unknown')
-            sources[source] = sources.get(source, 0) + 1
-        
         print(f"\n📚 Documents by Source:")
         for source, count in sources.items():
             percentage = (count / total_docs) * 100
             print(f"   {source}: {count:,} ({percentage:.1f}%)")
         
         # Wikipedia-specific stats
-        wikipedia_docs = [doc for doc in documents if doc.get('meta', {}).get('source') == 'wikipedia']
         if wikipedia_docs:
-            wiki_titles = set(doc.get('meta', {}).get('title', 'Unknown') for doc in wikipedia_docs)
             print(f"\n📖 Wikipedia Statistics:")
-            print(f"   📄 Total Wikipedia chunks: {len(wikipedia_docs):,}")
+            print(f"   📄 Total Wikipedia chunks: {wikipedia_docs:,}")
             print(f"   📚 Unique Wikipedia articles: {len(wiki_titles):,}")
-            avg_chunks_per_article = len(wikipedia_docs) / len(wiki_titles) if wiki_titles else 0
+            avg_chunks_per_article = wikipedia_docs / len(wiki_titles) if wiki_titles else 0
             print(f"   📈 Average chunks per article: {avg_chunks_per_article:.1f}")
         
     except Exception as e:
@@ -234,32 +377,30 @@ def main():
         print("❌ Failed to load existing metadata")
         return
     
-    existing_count = len(existing_data.get('documents', []))
+    existing_count = existing_data['documents_count']
     
-    # Load Wikipedia chunks
-    wikipedia_chunks = load_wikipedia_chunks("wikipedia_test")
-    if not wikipedia_chunks:
+    # Locate Wikipedia chunks (streamed later, never loaded all at once)
+    data_dir = "wikipedia_test"
+    batch_files = list_wikipedia_batch_files(data_dir)
+    if not batch_files:
         print("❌ No Wikipedia chunks found")
         return
     
-    # Convert to metadata format
-    new_documents = convert_wikipedia_to_metadata_format(wikipedia_chunks, start_id=existing_count)
-    
     # Confirm before merging
     print(f"\n🎯 Integration Plan:")
     print(f"   📄 Existing documents: {existing_count:,}")
-    print(f"   📄 New Wikipedia documents: {len(new_documents):,}")
-    print(f"   📄 Total after merge: {existing_count + len(new_documents):,}")
+    print(f"   📦 Wikipedia batch files: {len(batch_files):,}")
     
     confirm = input(f"\n✅ Proceed with integration? (y/n): ").lower().strip()
     if confirm != 'y':
         print("❌ Integration cancelled")
         return
     
-    # Merge and save
-    success = merge_and_save_metadata(existing_data, new_documents)
+    # Stream chunks through the converter straight into the writer
+    new_documents = convert_wikipedia_to_metadata_format(iter_wikipedia_chunks(data_dir), start_id=existing_count)
+    added_count = merge_and_save_metadata(existing_data, new_documents)
     
-    if success:
+    if added_count is not None:
         # Validate the result
         is_valid = validate_merged_metadata()
         
@@ -268,8 +409,8 @@ def main():
             show_statistics()
             
             print(f"\n🎉 Wikipedia Integration Complete!")
-            print(f"✅ {len(new_documents):,} Wikipedia documents added successfully")
-            print(f"📄 Total dataset now contains {existing_count + len(new_documents):,} documents")
+            print(f"✅ {added_count:,} Wikipedia documents added successfully")
+            print(f"📄 Total dataset now contains {existing_count + added_count:,} documents")
             print(f"🚀 Ready for enhanced Arabic question answering!")
         else:
             print(f"\n❌ Integration completed but validation failed")
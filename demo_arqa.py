@@ -6,8 +6,13 @@ Shows how to use the working ARQA system without Haystack dependencies
 
 import sys
 import os
+import re
+from collections import defaultdict
 sys.path.insert(0, '.')
 
+# Compiled once and shared by document indexing and question matching
+WORD_PATTERN = re.compile(r'\w+')
+
 def demo_arqa_system():
     """Demonstrate the complete ARQA system"""
     print("🌟 ARQA - Arabic Question Answering System Demo")
@@ -39,6 +44,12 @@ def demo_arqa_system():
     
     print(f"\n📊 Total processed: {len(all_documents)} document chunks")
     
+    # Build an inverted index once: token -> indices of documents containing it
+    inverted_index = defaultdict(set)
+    for doc_idx, doc in enumerate(all_documents):
+        for token in WORD_PATTERN.findall(doc['content'].lower()):
+            inverted_index[token].add(doc_idx)
+    
     # Step 2: Question Answering
     print("\n🤖 Step 2: Question Answering")
     print("-" * 30)
@@ -64,13 +75,13 @@ def demo_arqa_system():
             
             # Find relevant document
             best_doc = None
-            best_score = 0
             
-            for doc in all_documents:
-                # Simple keyword matching (replace with proper retrieval later)
-                if any(word in doc['content'].lower() for word in question.lower().split()):
-                    best_doc = doc
-                    break
+            # Simple keyword matching (replace with proper retrieval later):
+            # first document sharing any token with the question
+            question_tokens = set(WORD_PATTERN.findall(question.lower()))
+            candidates = set().union(*(inverted_index[token] for token in question_tokens if token in inverted_index))
+            if candidates:
+                best_doc = all_documents[min(candidates)]
             
             if best_doc:
                 context = best_doc['content'][:500]  # Limit context length
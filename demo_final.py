@@ -8,6 +8,9 @@ import requests
 import json
 import time
 
+# Shared session so every call reuses the same keep-alive connection
+session = requests.Session()
+
 def demonstrate_arqa():
     print("🎯 ARQA - Arabic Question Answering System")
     print("=" * 60)
@@ -19,7 +22,7 @@ def demonstrate_arqa():
     # Step 1: System Status
     print("\n🔧 SYSTEM STATUS:")
     try:
-        response = requests.get(f"{BASE_URL}/status")
+        response = session.get(f"{BASE_URL}/status")
         if response.status_code == 200:
             data = response.json()
             print(f"   ✅ System Initialized: {data.get('initialized')}")
@@ -44,7 +47,7 @@ def demonstrate_arqa():
         with open(test_file, 'rb') as f:
             files = {'file': ('arabic_science.html', f, 'text/html')}
             start_time = time.time()
-            response = requests.post(f"{BASE_URL}/upload", files=files)
+            response = session.post(f"{BASE_URL}/upload", files=files)
             upload_time = time.time() - start_time
             
         if response.status_code == 200:
@@ -78,11 +81,7 @@ def demonstrate_arqa():
         }
         
         start_time = time.time()
-        response = requests.post(
-            f"{BASE_URL}/ask",
-            json=request_data,
-            headers={"Content-Type": "application/json"}
-        )
+        response = session.post(f"{BASE_URL}/ask", json=request_data)
         qa_time = time.time() - start_time
         
         if response.status_code == 200:
@@ -104,7 +103,7 @@ def demonstrate_arqa():
     
     # Step 4: Final Status
     print(f"\n📊 FINAL SYSTEM STATUS:")
-    response = requests.get(f"{BASE_URL}/documents")
+    response = session.get(f"{BASE_URL}/documents")
     if response.status_code == 200:
         data = response.json()
         print(f"   📄 Total documents in system: {data.get('document_count', 'Unknown')}")
@@ -128,4 +127,7 @@ def demonstrate_arqa():
     print(f"   🔧 All 4 phases working together successfully!")
 
 if __name__ == "__main__":
-    demonstrate_arqa()
+    try:
+        demonstrate_arqa()
+    finally:
+        session.close()
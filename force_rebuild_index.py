@@ -6,7 +6,7 @@ Completely rebuild the FAISS index from scratch
 
 import os
 import sys
-import json
+from collections import Counter
 
 # Add project root to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
@@ -17,7 +17,8 @@ def main():
     
     # Import the retriever
     try:
-        from arqa.retriever_optimized_fixed import OptimizedArabicRetriever
+        from arqa.retriever_optimized_fixed import OptimizedArabicRetriever, choose_index_factory
+        from arqa.document_store import iter_documents, move_documents, read_header_value
         print("✅ Successfully imported OptimizedArabicRetriever")
     except ImportError as e:
         print(f"❌ Error importing retriever: {e}")
@@ -28,20 +29,15 @@ def main():
     print(f"📁 Loading documents from: {metadata_file}")
     
     try:
-        with open(metadata_file, 'r', encoding='utf-8') as f:
-            metadata = json.load(f)
-        
-        documents = metadata.get('documents', [])
-        model_name = metadata.get('model_name', 'abdoelsayed/AraDPR')
+        # Parquet shards (or the legacy 'documents' list of older files)
+        documents = list(iter_documents(metadata_file))
+        model_name = read_header_value(metadata_file, 'model_name', 'abdoelsayed/AraDPR')
         
         print(f"✅ Loaded {len(documents):,} documents")
         print(f"🤖 Model: {model_name}")
         
         # Show breakdown by source
-        sources = {}
-        for doc in documents:
-            source = doc.get('meta', {}).get('source', 'unknown')
-            sources[source] = sources.get(source, 0) + 1
+        sources = Counter(doc.get('meta', {}).get('source', 'unknown') for doc in documents)
         
         print(f"📊 Document sources:")
         for source, count in sources.items():
@@ -64,13 +60,17 @@ def main():
     
     # Initialize fresh retriever
     print(f"\n🔧 Initializing fresh retriever...")
+    index_factory = choose_index_factory(len(documents))
     try:
         retriever = OptimizedArabicRetriever(
             model_name=model_name,
             index_path="./faiss_index",
             documents_path="./temp_metadata.json",  # Use temp file to avoid conflicts
-            batch_size=32,
-            device="auto"
+            batch_size=256,  # Encoder batch; the retriever chunks the corpus internally
+            device="auto",
+            index_factory=index_factory,
+            nprobe=32,
+            embedding_cache_path="./.emb_cache"  # Re-runs skip already encoded chunks
         )
         print(f"✅ Fresh retriever initialized")
         
@@ -86,35 +86,26 @@ def main():
     print(f"   📄 Documents to index: {len(documents):,}")
     print(f"   🤖 Model: {model_name}")
     print(f"   📁 Fresh index: ./faiss_index.faiss")
-    print(f"   ⚡ Batch size: 32")
+    print(f"   🗂️ Index type: {index_factory} (inner product)")
+    print(f"   ⚡ Batch size: 256")
+    print(f"   💾 Embedding cache: ./.emb_cache (cached chunks skip tokenization and encoding)")
     
     confirm = input(f"\n✅ Proceed with FORCE rebuilding the index? (y/n): ").lower().strip()
     if confirm != 'y':
         print("❌ Index rebuild cancelled")
         return
     
-    # Add all documents in batches
+    # Add all documents in one call; the encoder batches internally and the
+    # index/metadata are written once instead of after every slice
     print(f"\n🚀 Starting FORCE index rebuild...")
-    batch_size = 1000
-    total_processed = 0
     
     try:
-        for i in range(0, len(documents), batch_size):
-            batch = documents[i:i + batch_size]
-            batch_num = i // batch_size + 1
-            total_batches = (len(documents) + batch_size - 1) // batch_size
-            
-            print(f"\n📦 Processing batch {batch_num}/{total_batches} ({len(batch)} documents)...")
-            
-            result = retriever.add_documents_incremental(
-                documents=batch,
-                background=False,
-                force_reindex=True
-            )
-            
-            total_processed += result.get('new_documents', 0)
-            print(f"   ✅ Processed: {result.get('new_documents', 0)} documents")
-            print(f"   📊 Total so far: {total_processed:,}/{len(documents):,}")
+        result = retriever.add_documents_incremental(
+            documents=documents,
+            background=False,
+            force_reindex=True
+        )
+        total_processed = result.get('new_documents', 0)
         
         print(f"\n🎉 FORCE Index Rebuild Complete!")
         print(f"✅ Total processed: {total_processed:,}")
@@ -131,8 +122,8 @@ def main():
         
         # Save the final index with correct path
         print(f"\n💾 Saving final index...")
+        move_documents("./temp_metadata.json", "./documents_metadata.json")
         retriever.documents_path = "./documents_metadata.json"
-        retriever.save_index()
         print(f"✅ Index saved to ./faiss_index.faiss")
         
         # Test search functionality
@@ -144,13 +135,12 @@ def main():
                 "العلوم"
             ]
             
-            for query in test_queries:
-                results = retriever.retrieve(query, top_k=2)
+            for query, results in zip(test_queries, retriever.retrieve_batch(test_queries, top_k=2)):
                 print(f"✅ Query: '{query}' → {len(results)} results")
                 for j, result in enumerate(results, 1):
-                    title = result.metadata.get('title', 'Unknown')
+                    title = result.meta.get('title', 'Unknown')
                     score = result.score
-                    source = result.metadata.get('source', 'unknown')
+                    source = result.meta.get('source', 'unknown')
                     print(f"   {j}. [{source}] {title} (Score: {score:.3f})")
                 
         except Exception as e:
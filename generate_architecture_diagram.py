@@ -1,168 +1,169 @@
 #!/usr/bin/env python3
 """
 Generate ARQA System Architecture Diagram for Paper
+Emits the SVG directly; PNG/PDF are converted from it with cairosvg when installed.
 """
 
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-from matplotlib.patches import FancyBboxPatch, ConnectionPatch
-import numpy as np
-
-def create_arqa_architecture_diagram():
-    """Create a professional architecture diagram for ARQA system."""
-    
-    # Create figure with larger size for better quality
-    fig, ax = plt.subplots(1, 1, figsize=(14, 10))
-    ax.set_xlim(0, 10)
-    ax.set_ylim(0, 12)
-    ax.axis('off')
-    
-    # Color scheme
-    colors = {
-        'input': '#E8F4FD',
-        'processing': '#D4E6F1', 
-        'indexing': '#A9DFBF',
-        'query': '#F9E79F',
-        'extraction': '#F1C40F',
-        'api': '#E8DAEF',
-        'output': '#FADBD8',
-        'arrow': '#2C3E50',
-        'text': '#2C3E50'
-    }
-    
-    # Box style
-    box_style = "round,pad=0.1"
-    
-    # Title
-    ax.text(5, 11.5, 'ARQA System Architecture Overview', 
-            fontsize=16, fontweight='bold', ha='center', color=colors['text'])
-    
-    # Input Layer
-    input_box1 = FancyBboxPatch((0.5, 10), 2, 0.8, boxstyle=box_style, 
-                               facecolor=colors['input'], edgecolor='black', linewidth=1)
-    ax.add_patch(input_box1)
-    ax.text(1.5, 10.4, 'HTML Documents\n(Arabic Content)', 
-            ha='center', va='center', fontsize=10, fontweight='bold')
-    
-    input_box2 = FancyBboxPatch((7.5, 10), 2, 0.8, boxstyle=box_style,
-                               facecolor=colors['input'], edgecolor='black', linewidth=1)
-    ax.add_patch(input_box2)
-    ax.text(8.5, 10.4, 'User Questions\n(Arabic Text)', 
-            ha='center', va='center', fontsize=10, fontweight='bold')
-    
-    # Document Processing
-    proc_box = FancyBboxPatch((0.5, 8.5), 4, 1.2, boxstyle=box_style,
-                             facecolor=colors['processing'], edgecolor='black', linewidth=1)
-    ax.add_patch(proc_box)
-    ax.text(2.5, 9.1, 'Document Processing Pipeline', 
-            ha='center', va='center', fontsize=11, fontweight='bold')
-    ax.text(2.5, 8.8, '• HTML Parser (BeautifulSoup)', ha='center', va='center', fontsize=9)
-    ax.text(2.5, 8.6, '• Text Preservation (No Normalization)', ha='center', va='center', fontsize=9)
-    ax.text(2.5, 8.4, '• Chunking (200 tokens, 50 overlap)', ha='center', va='center', fontsize=9)
-    
-    # Semantic Indexing
-    index_box = FancyBboxPatch((0.5, 6.8), 4, 1.2, boxstyle=box_style,
-                              facecolor=colors['indexing'], edgecolor='black', linewidth=1)
-    ax.add_patch(index_box)
-    ax.text(2.5, 7.4, 'Semantic Indexing', 
-            ha='center', va='center', fontsize=11, fontweight='bold')
-    ax.text(2.5, 7.1, '• AraDPR Encoder (768-dim)', ha='center', va='center', fontsize=9)
-    ax.text(2.5, 6.9, '• FAISS Vector Index (Incremental)', ha='center', va='center', fontsize=9)
-    
-    # Query Processing
-    query_box = FancyBboxPatch((5.5, 8.5), 4, 1.2, boxstyle=box_style,
-                              facecolor=colors['query'], edgecolor='black', linewidth=1)
-    ax.add_patch(query_box)
-    ax.text(7.5, 9.1, 'Query Processing', 
-            ha='center', va='center', fontsize=11, fontweight='bold')
-    ax.text(7.5, 8.8, '• Question Normalization (Light)', ha='center', va='center', fontsize=9)
-    ax.text(7.5, 8.6, '• AraDPR Query Encoding', ha='center', va='center', fontsize=9)
-    ax.text(7.5, 8.4, '• Top-K Similarity Search', ha='center', va='center', fontsize=9)
-    
-    # Answer Extraction
-    extract_box = FancyBboxPatch((2.5, 4.5), 5, 1.8, boxstyle=box_style,
-                                facecolor=colors['extraction'], edgecolor='black', linewidth=1)
-    ax.add_patch(extract_box)
-    ax.text(5, 5.7, 'Answer Extraction', 
-            ha='center', va='center', fontsize=11, fontweight='bold')
-    ax.text(5, 5.4, '• Multi-Model QA System:', ha='center', va='center', fontsize=9, fontweight='bold')
-    ax.text(5, 5.2, '  - Arabic BERT (Primary)', ha='center', va='center', fontsize=9)
-    ax.text(5, 5.0, '  - AraELECTRA (Fallback)', ha='center', va='center', fontsize=9)
-    ax.text(5, 4.8, '  - XLM-RoBERTa (Multilingual)', ha='center', va='center', fontsize=9)
-    ax.text(5, 4.6, '• Non-normalized Context + Span Prediction', ha='center', va='center', fontsize=9)
-    
-    # API Layer
-    api_box = FancyBboxPatch((2.5, 2.8), 5, 1.2, boxstyle=box_style,
-                            facecolor=colors['api'], edgecolor='black', linewidth=1)
-    ax.add_patch(api_box)
-    ax.text(5, 3.4, 'FastAPI REST Interface', 
-            ha='center', va='center', fontsize=11, fontweight='bold')
-    ax.text(5, 3.1, '• Background Processing & Status Monitoring', ha='center', va='center', fontsize=9)
-    ax.text(5, 2.9, '• Real-time Interaction & Error Handling', ha='center', va='center', fontsize=9)
-    
-    # Output
-    output_box = FancyBboxPatch((2.5, 1), 5, 1.2, boxstyle=box_style,
-                               facecolor=colors['output'], edgecolor='black', linewidth=1)
-    ax.add_patch(output_box)
-    ax.text(5, 1.6, 'Output', 
-            ha='center', va='center', fontsize=11, fontweight='bold')
-    ax.text(5, 1.3, '• Ranked Answers with Confidence Scores', ha='center', va='center', fontsize=9)
-    ax.text(5, 1.1, '• Original Arabic Character Preservation', ha='center', va='center', fontsize=9)
-    
-    # Arrows - Data Flow
-    arrows = [
-        # HTML to Processing
-        ((1.5, 10), (2.5, 9.7)),
-        # Processing to Indexing  
-        ((2.5, 8.5), (2.5, 8.0)),
-        # Questions to Query Processing
-        ((8.5, 10), (7.5, 9.7)),
-        # Query Processing to Answer Extraction
-        ((7.5, 8.5), (6, 6.3)),
-        # Indexing to Answer Extraction  
-        ((2.5, 6.8), (4, 6.3)),
-        # Answer Extraction to API
-        ((5, 4.5), (5, 4.0)),
-        # API to Output
-        ((5, 2.8), (5, 2.2))
-    ]
-    
-    for start, end in arrows:
-        arrow = ConnectionPatch(start, end, "data", "data",
-                              arrowstyle="->", shrinkA=5, shrinkB=5,
-                              mutation_scale=20, fc=colors['arrow'], 
-                              edgecolor=colors['arrow'], linewidth=2)
-        ax.add_patch(arrow)
-    
-    # Key Features Box
-    features_box = FancyBboxPatch((0.2, 0.2), 9.6, 0.6, boxstyle=box_style,
-                                 facecolor='white', edgecolor='black', linewidth=1)
-    ax.add_patch(features_box)
-    ax.text(5, 0.5, 'Key Features: Text Authenticity Preservation • Incremental Indexing • Multi-model Fallback • Sub-130ms Response Time',
-            ha='center', va='center', fontsize=10, fontweight='bold', style='italic')
-    
-    plt.tight_layout()
-    return fig
+import os
+from html import escape
+
+SVG_FILE = 'arqa_architecture.svg'
+OUTPUT_FILES = [SVG_FILE, 'arqa_architecture.png', 'arqa_architecture.pdf']
+
+# Diagram coordinates are in data units (x: 0-10, y: 0-12, origin bottom-left)
+WIDTH, HEIGHT = 1400, 1000
+X_SCALE, Y_SCALE = WIDTH / 10, HEIGHT / 12
+PT_TO_PX = 100 / 72
+
+# Color scheme
+COLORS = {
+    'input': '#E8F4FD',
+    'processing': '#D4E6F1',
+    'indexing': '#A9DFBF',
+    'query': '#F9E79F',
+    'extraction': '#F1C40F',
+    'api': '#E8DAEF',
+    'output': '#FADBD8',
+    'arrow': '#2C3E50',
+    'text': '#2C3E50'
+}
+
+# (x, y, width, height, fill) for each box
+BOXES = [
+    (0.5, 10, 2, 0.8, COLORS['input']),         # HTML documents
+    (7.5, 10, 2, 0.8, COLORS['input']),         # User questions
+    (0.5, 8.5, 4, 1.2, COLORS['processing']),   # Document processing
+    (0.5, 6.8, 4, 1.2, COLORS['indexing']),     # Semantic indexing
+    (5.5, 8.5, 4, 1.2, COLORS['query']),        # Query processing
+    (2.5, 4.5, 5, 1.8, COLORS['extraction']),   # Answer extraction
+    (2.5, 2.8, 5, 1.2, COLORS['api']),          # API layer
+    (2.5, 1, 5, 1.2, COLORS['output']),         # Output
+    (0.2, 0.2, 9.6, 0.6, 'white'),              # Key features
+]
+
+# (x, y, text, font size, bold, italic)
+LABELS = [
+    (5, 11.5, 'ARQA System Architecture Overview', 16, True, False),
+    (1.5, 10.55, 'HTML Documents', 10, True, False),
+    (1.5, 10.25, '(Arabic Content)', 10, True, False),
+    (8.5, 10.55, 'User Questions', 10, True, False),
+    (8.5, 10.25, '(Arabic Text)', 10, True, False),
+    (2.5, 9.1, 'Document Processing Pipeline', 11, True, False),
+    (2.5, 8.8, '• HTML Parser (BeautifulSoup)', 9, False, False),
+    (2.5, 8.6, '• Text Preservation (No Normalization)', 9, False, False),
+    (2.5, 8.4, '• Chunking (200 tokens, 50 overlap)', 9, False, False),
+    (2.5, 7.4, 'Semantic Indexing', 11, True, False),
+    (2.5, 7.1, '• AraDPR Encoder (768-dim)', 9, False, False),
+    (2.5, 6.9, '• FAISS Vector Index (Incremental)', 9, False, False),
+    (7.5, 9.1, 'Query Processing', 11, True, False),
+    (7.5, 8.8, '• Question Normalization (Light)', 9, False, False),
+    (7.5, 8.6, '• AraDPR Query Encoding', 9, False, False),
+    (7.5, 8.4, '• Top-K Similarity Search', 9, False, False),
+    (5, 5.7, 'Answer Extraction', 11, True, False),
+    (5, 5.4, '• Multi-Model QA System:', 9, True, False),
+    (5, 5.2, '  - Arabic BERT (Primary)', 9, False, False),
+    (5, 5.0, '  - AraELECTRA (Fallback)', 9, False, False),
+    (5, 4.8, '  - XLM-RoBERTa (Multilingual)', 9, False, False),
+    (5, 4.6, '• Non-normalized Context + Span Prediction', 9, False, False),
+    (5, 3.4, 'FastAPI REST Interface', 11, True, False),
+    (5, 3.1, '• Background Processing & Status Monitoring', 9, False, False),
+    (5, 2.9, '• Real-time Interaction & Error Handling', 9, False, False),
+    (5, 1.6, 'Output', 11, True, False),
+    (5, 1.3, '• Ranked Answers with Confidence Scores', 9, False, False),
+    (5, 1.1, '• Original Arabic Character Preservation', 9, False, False),
+    (5, 0.5, 'Key Features: Text Authenticity Preservation • Incremental Indexing • '
+             'Multi-model Fallback • Sub-130ms Response Time', 10, True, True),
+]
+
+# Arrows - Data Flow
+ARROWS = [
+    ((1.5, 10), (2.5, 9.7)),    # HTML to Processing
+    ((2.5, 8.5), (2.5, 8.0)),   # Processing to Indexing
+    ((8.5, 10), (7.5, 9.7)),    # Questions to Query Processing
+    ((7.5, 8.5), (6, 6.3)),     # Query Processing to Answer Extraction
+    ((2.5, 6.8), (4, 6.3)),     # Indexing to Answer Extraction
+    ((5, 4.5), (5, 4.0)),       # Answer Extraction to API
+    ((5, 2.8), (5, 2.2)),       # API to Output
+]
+
+SVG_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}" font-family="DejaVu Sans, Arial, sans-serif">
+  <defs>
+    <marker id="arrowhead" markerWidth="10" markerHeight="8" refX="9" refY="4" orient="auto">
+      <path d="M0,0 L10,4 L0,8" fill="none" stroke="{arrow_color}" stroke-width="1.5"/>
+    </marker>
+  </defs>
+  <rect width="100%" height="100%" fill="white"/>
+{body}
+</svg>
+"""
+
+def _px(x: float, y: float):
+    """Convert data coordinates to SVG pixels (SVG y grows downwards)."""
+    return x * X_SCALE, HEIGHT - y * Y_SCALE
+
+def create_arqa_architecture_diagram() -> str:
+    """Create a professional architecture diagram for ARQA system as an SVG string."""
+    elements = []
+
+    for x, y, w, h, fill in BOXES:
+        left, top = _px(x, y + h)
+        elements.append(
+            f'  <rect x="{left:.1f}" y="{top:.1f}" width="{w * X_SCALE:.1f}" height="{h * Y_SCALE:.1f}" '
+            f'rx="10" fill="{fill}" stroke="black" stroke-width="1"/>'
+        )
+
+    for (x1, y1), (x2, y2) in ARROWS:
+        (sx, sy), (ex, ey) = _px(x1, y1), _px(x2, y2)
+        elements.append(
+            f'  <path d="M{sx:.1f},{sy:.1f} L{ex:.1f},{ey:.1f}" stroke="{COLORS["arrow"]}" '
+            f'stroke-width="2" marker-end="url(#arrowhead)"/>'
+        )
+
+    for x, y, text, size, bold, italic in LABELS:
+        px, py = _px(x, y)
+        style = ' font-weight="bold"' if bold else ''
+        style += ' font-style="italic"' if italic else ''
+        elements.append(
+            f'  <text x="{px:.1f}" y="{py:.1f}" font-size="{size * PT_TO_PX:.1f}" text-anchor="middle" '
+            f'dominant-baseline="central" fill="{COLORS["text"]}" xml:space="preserve"{style}>{escape(text)}</text>'
+        )
+
+    return SVG_TEMPLATE.format(width=WIDTH, height=HEIGHT, arrow_color=COLORS['arrow'], body='\n'.join(elements))
+
+def diagram_is_up_to_date() -> bool:
+    """Check whether every output file is newer than this script."""
+    source_mtime = os.path.getmtime(__file__)
+    return all(os.path.exists(path) and os.path.getmtime(path) > source_mtime for path in OUTPUT_FILES)
+
+def main():
+    # Skip regeneration when the diagram source has not changed
+    if diagram_is_up_to_date():
+        print("✅ Architecture diagram is up to date:")
+        for path in OUTPUT_FILES:
+            print(f"   📄 {path}")
+        return
 
-if __name__ == "__main__":
-    # Set matplotlib to non-interactive backend
-    import matplotlib
-    matplotlib.use('Agg')  # Use non-interactive backend
-    
     # Generate the diagram
-    fig = create_arqa_architecture_diagram()
-    
-    # Save as high-quality PNG for paper
-    fig.savefig('arqa_architecture.png', dpi=300, bbox_inches='tight', 
-                facecolor='white', edgecolor='none')
-    
-    # Also save as PDF for vector graphics
-    fig.savefig('arqa_architecture.pdf', bbox_inches='tight', 
-                facecolor='white', edgecolor='none')
-    
+    svg = create_arqa_architecture_diagram()
+    with open(SVG_FILE, 'w', encoding='utf-8') as f:
+        f.write(svg)
+
     print("✅ Architecture diagram saved as:")
+    print(f"   📄 {SVG_FILE} (vector source)")
+
+    # Raster/PDF versions for LaTeX
+    try:
+        import cairosvg
+    except (ImportError, OSError):  # OSError: cairosvg installed but the cairo library is missing
+        print("💡 Install cairosvg (and cairo) to also export arqa_architecture.png and arqa_architecture.pdf")
+        return
+
+    svg_bytes = svg.encode('utf-8')
+    cairosvg.svg2png(bytestring=svg_bytes, write_to='arqa_architecture.png', scale=3)
+    cairosvg.svg2pdf(bytestring=svg_bytes, write_to='arqa_architecture.pdf')
     print("   📄 arqa_architecture.png (for LaTeX)")
     print("   📄 arqa_architecture.pdf (vector version)")
-    
-    # Don't show the diagram in headless mode
-    # plt.show()
+
+if __name__ == "__main__":
+    main()
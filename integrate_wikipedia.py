@@ -6,47 +6,73 @@ Load Wikipedia chunks into the question answering system
 
 import os
 import sys
-import json
 import glob
+import html
+import asyncio
 import requests
 import time
-from typing import List, Dict, Any
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Iterator
 
-def load_wikipedia_data(directory: str) -> List[Dict[str, Any]]:
-    """Load all processed Wikipedia data from directory"""
+import httpx
+import ijson
+import orjson
+
+def iter_wikipedia_data(directory: str) -> Iterator[Dict[str, Any]]:
+    """Stream processed Wikipedia chunks from directory, one batch file at a time"""
     
     print(f"📁 Loading Wikipedia data from: {directory}")
     
     if not os.path.exists(directory):
         print(f"❌ Directory not found: {directory}")
-        return []
+        return
     
-    # Find all batch files
-    batch_files = glob.glob(os.path.join(directory, "wikipedia_batch_*.json"))
+    # Find all batch files (JSON Lines, plus legacy JSON array batches)
+    batch_files = sorted(glob.glob(os.path.join(directory, "wikipedia_batch*.jsonl")))
+    batch_files += sorted(glob.glob(os.path.join(directory, "wikipedia_batch_*.json")))
     
     if not batch_files:
         print(f"❌ No Wikipedia batch files found in {directory}")
-        return []
+        return
     
     print(f"📦 Found {len(batch_files)} batch files")
     
-    all_documents = []
-    for batch_file in sorted(batch_files):
+    for batch_file in batch_files:
         try:
-            with open(batch_file, 'r', encoding='utf-8') as f:
-                batch_data = json.load(f)
-                all_documents.extend(batch_data)
-                print(f"   ✅ Loaded {len(batch_data)} chunks from {os.path.basename(batch_file)}")
+            with open(batch_file, 'rb') as f:
+                if batch_file.endswith('.jsonl'):
+                    for line in f:
+                        if line.strip():
+                            yield orjson.loads(line)
+                else:
+                    for doc in ijson.items(f, 'item', use_float=True):
+                        yield doc
         except Exception as e:
             print(f"   ❌ Error loading {batch_file}: {e}")
-    
-    print(f"📄 Total chunks loaded: {len(all_documents):,}")
-    return all_documents
 
-def test_api_integration(documents: List[Dict[str, Any]], api_url: str = "http://localhost:8000"):
+def build_sample_xml(i: int, doc: Dict[str, Any]) -> bytes:
+    """Wrap one Wikipedia chunk in the XML format accepted by the upload endpoints"""
+    title = doc['metadata'].get('title', f'Wikipedia Article {i+1}')
+    
+    # Escape text so '<' or '&' in article content cannot break the XML
+    return (
+        b'<?xml version="1.0" encoding="UTF-8"?>\n<article>\n    <title>'
+        + html.escape(title).encode('utf-8')
+        + b'</title>\n    <content>\n        '
+        + html.escape(doc['content']).encode('utf-8')
+        + b'\n    </content>\n</article>'
+    )
+
+def test_api_integration(documents: Iterable[Dict[str, Any]], api_url: str = "http://localhost:8000"):
     """Test integration with ARQA API"""
     
-    print(f"🧪 Testing API integration with {len(documents):,} Wikipedia chunks")
+    # Only a handful of samples are uploaded, so never read past them
+    sample_docs = list(islice(documents, 5))
+    if not sample_docs:
+        print("❌ No documents loaded")
+        return False
+    
+    print(f"🧪 Testing API integration with {len(sample_docs)} sample Wikipedia chunks")
     
     # Check API status
     try:
@@ -63,51 +89,42 @@ def test_api_integration(documents: List[Dict[str, Any]], api_url: str = "http:/
         print(f"💡 Make sure to start the API with: python run_api.py")
         return False
     
-    # Test with sample Wikipedia content by creating temporary XML files
+    # Send all samples as one multipart request so the server encodes them together
     print(f"\n📤 Testing Wikipedia content upload...")
     
-    # Take first 5 documents as samples
-    sample_docs = documents[:5]
-    
-    for i, doc in enumerate(sample_docs):
-        try:
-            # Create XML content from the document
-            title = doc['metadata'].get('title', f'Wikipedia Article {i+1}')
-            content = doc['content']
-            
-            xml_content = f"""<?xml version="1.0" encoding="UTF-8"?>
-<article>
-    <title>{title}</title>
-    <content>
-        {content}
-    </content>
-</article>"""
-            
-            # Create temporary file
-            import tempfile
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.xml', delete=False, encoding='utf-8') as temp_file:
-                temp_file.write(xml_content)
-                temp_file_path = temp_file.name
-            
-            # Upload to API
-            with open(temp_file_path, 'rb') as f:
-                files = {'file': (f'wikipedia_sample_{i+1}.xml', f, 'application/xml')}
-                response = requests.post(f"{api_url}/upload", files=files)
-            
-            # Clean up
-            os.unlink(temp_file_path)
+    try:
+        files = [
+            ('files', (f'wikipedia_sample_{i+1}.xml', build_sample_xml(i, doc), 'application/xml'))
+            for i, doc in enumerate(sample_docs)
+        ]
+        response = requests.post(f"{api_url}/upload_batch", files=files, timeout=300)
+        
+        if response.status_code == 200:
+            result = response.json()
+            print(f"   ✅ Uploaded {len(files)} samples: {result.get('chunks_created')} chunks created")
+        else:
+            print(f"   ❌ Batch upload failed: {response.status_code}")
             
-            if response.status_code == 200:
-                result = response.json()
-                print(f"   ✅ Sample {i+1}: {result.get('chunks_created')} chunks created")
-            else:
-                print(f"   ❌ Sample {i+1} failed: {response.status_code}")
-                
-        except Exception as e:
-            print(f"   ❌ Error uploading sample {i+1}: {e}")
+    except Exception as e:
+        print(f"   ❌ Error uploading samples: {e}")
     
     return True
 
+async def ask_questions(questions: List[str], api_url: str) -> List[Any]:
+    """Send all questions to /ask concurrently; each result is a response or the raised exception"""
+    async with httpx.AsyncClient(base_url=api_url, timeout=30) as client:
+        return await asyncio.gather(
+            *[
+                client.post("/ask", json={
+                    "question": question,
+                    "top_k": 3,
+                    "min_confidence": 0.01
+                })
+                for question in questions
+            ],
+            return_exceptions=True
+        )
+
 def test_wikipedia_questions(api_url: str = "http://localhost:8000"):
     """Test Arabic questions on Wikipedia content"""
     
@@ -127,13 +144,13 @@ def test_wikipedia_questions(api_url: str = "http://localhost:8000"):
     
     successful_answers = 0
     
-    for i, question in enumerate(test_questions, 1):
+    # Questions are independent, so wall time is one round-trip instead of eight
+    responses = asyncio.run(ask_questions(test_questions, api_url))
+    
+    for i, (question, response) in enumerate(zip(test_questions, responses), 1):
         try:
-            response = requests.post(f"{api_url}/ask", json={
-                "question": question,
-                "top_k": 3,
-                "min_confidence": 0.01
-            }, timeout=30)
+            if isinstance(response, Exception):
+                raise response
             
             if response.status_code == 200:
                 result = response.json()
@@ -171,10 +188,8 @@ def main():
     print("=" * 50)
     
     # List available processed directories
-    processed_dirs = []
-    for item in os.listdir('.'):
-        if os.path.isdir(item) and item.startswith('wikipedia_'):
-            processed_dirs.append(item)
+    with os.scandir('.') as entries:
+        processed_dirs = [entry.name for entry in entries if entry.name.startswith('wikipedia_') and entry.is_dir()]
     
     if not processed_dirs:
         print("❌ No processed Wikipedia directories found")
@@ -182,14 +197,16 @@ def main():
         return
     
     print("📁 Available processed Wikipedia datasets:")
+    chunk_counts = {}
     for i, dir_name in enumerate(processed_dirs, 1):
         # Load stats if available
         stats_file = os.path.join(dir_name, "wikipedia_processing_stats.json")
         if os.path.exists(stats_file):
-            with open(stats_file, 'r', encoding='utf-8') as f:
-                stats = json.load(f)
+            with open(stats_file, 'rb') as f:
+                stats = orjson.loads(f.read())
             articles = stats.get('articles_processed', 0)
             chunks = stats.get('chunks_created', 0)
+            chunk_counts[dir_name] = chunks
             print(f"   {i}. {dir_name} ({articles:,} articles, {chunks:,} chunks)")
         else:
             print(f"   {i}. {dir_name}")
@@ -207,12 +224,8 @@ def main():
         print("❌ Invalid selection")
         return
     
-    # Load Wikipedia data
-    documents = load_wikipedia_data(selected_dir)
-    
-    if not documents:
-        print("❌ No documents loaded")
-        return
+    # Stream Wikipedia data (nothing is read until the upload test pulls samples)
+    documents = iter_wikipedia_data(selected_dir)
     
     # Test API integration
     api_success = test_api_integration(documents)
@@ -223,7 +236,8 @@ def main():
         
         if qa_success:
             print(f"\n🎉 Wikipedia Integration Successful!")
-            print(f"✅ Your ARQA system now has access to {len(documents):,} Wikipedia chunks")
+            if selected_dir in chunk_counts:
+                print(f"✅ Dataset {selected_dir} provides {chunk_counts[selected_dir]:,} Wikipedia chunks")
             print(f"🤔 You can ask Arabic questions about Wikipedia content")
         else:
             print(f"\n⚠️ Integration partially successful")
@@ -9,6 +9,9 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 from arqa.simple_ingest import SimpleDocumentIngestor
 
+# Characters that normalization would change; shown to confirm they were preserved
+SPECIAL_CHARS = ('إ', 'أ', 'آ', 'ة', 'ى', 'ئ', 'ؤ', 'ء', 'ً', 'ٌ', 'ٍ', 'َ', 'ُ', 'ِ', 'ّ')
+
 def process_all_html_files():
     """Process all HTML files in the workspace."""
     
@@ -51,10 +54,9 @@ def process_all_html_files():
                     
                     # Show sample content and preserved characters
                     sample_content = documents[0]['content'][:300]
-                    special_chars = []
-                    for char in ['إ', 'أ', 'آ', 'ة', 'ى', 'ئ', 'ؤ', 'ء', 'ً', 'ٌ', 'ٍ', 'َ', 'ُ', 'ِ', 'ّ']:
-                        if char in sample_content:
-                            special_chars.append(char)
+                    # One pass over the sample, then set lookups (in display order)
+                    sample_chars = set(sample_content)
+                    special_chars = [char for char in SPECIAL_CHARS if char in sample_chars]
                     
                     if special_chars:
                         print(f"   📝 Original characters preserved: {', '.join(special_chars[:10])}")
@@ -78,11 +80,10 @@ def process_all_html_files():
     
     # Save processed documents
     if all_documents:
-        ingestor.save_documents(all_documents)
-        stats = ingestor.get_statistics()
+        saved_count = ingestor.save_documents(all_documents)
         print(f"\n💾 Documents saved:")
-        print(f"   📁 Output directory: {stats['output_directory']}")
-        print(f"   📄 Total documents: {stats['total_documents']}")
+        print(f"   📁 Output directory: {ingestor.output_dir}")
+        print(f"   📄 Total documents: {saved_count}")
 
 if __name__ == "__main__":
     process_all_html_files()
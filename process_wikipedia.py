@@ -7,23 +7,317 @@ Extracts and processes Arabic Wikipedia dump for question answering
 import os
 import sys
 import bz2
-import json
-import xml.etree.ElementTree as ET
-from typing import Dict, List, Any, Iterator
+import orjson
+from typing import BinaryIO, Dict, List, Any, Iterable, Iterator, Optional, Set, Tuple
 import re
 from datetime import datetime
 import tempfile
+import argparse
+import queue
+import shutil
+import subprocess
+import threading
+from contextlib import contextmanager
+from itertools import islice
+from multiprocessing import Pool
+from lxml import etree
+from tqdm import tqdm
+
+# Optional: parallel block-level bz2 decompression (pip install indexed_bzip2)
+try:
+    import indexed_bzip2
+except ImportError:
+    indexed_bzip2 = None
+
+# Optional: linear-time DFA regex engine for the wikitext patterns (pip install google-re2)
+try:
+    import re2 as regex_engine
+except ImportError:
+    regex_engine = re
 
 # Add project root to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
-from arqa.simple_ingest import SimpleDocumentIngestor
+# Progress bar: redrawn at most once per second; --quiet or ARQA_QUIET=1 hides it,
+# and it is skipped automatically when stdout is not a terminal
+PROGRESS_MININTERVAL = 1.0
+
+# Articles handed to each cleaning worker at a time
+CLEAN_CHUNKSIZE = 64
+
+# All chunks are appended to one JSON Lines file (one chunk per line)
+BATCH_FILE = "wikipedia_batch.jsonl"
+
+# Command line options of the last run, reused by --resume
+RUN_CONFIG_FILE = "wikipedia_run_config.json"
+
+# Decompressed bytes per read, and chunks buffered between reader and parser
+DECOMPRESS_CHUNK_SIZE = 1 << 20
+DECOMPRESS_QUEUE_SIZE = 16
+
+# Page boundaries in the raw dump
+PAGE_START = b'<page>'
+PAGE_END = b'</page>'
+
+# Cleaned articles shorter than this (in characters) are skipped
+MIN_ARTICLE_LENGTH = 100
+
+# Raw-byte markers for pages that are never articles
+MAIN_NAMESPACE = b'<ns>0</ns>'
+REDIRECT_PREFIXES = ('#تحويل'.encode('utf-8'), b'#REDIRECT')
+DISAMBIGUATION_TEMPLATES = ('{{توضيح'.encode('utf-8'), b'{{disambig', b'{{Disambig')
+
+# Wikitext patterns, compiled once at import. Flags are inline and no
+# lookaround is used so the same patterns run on re2 and on re.
+# Links: file/image and category links are dropped, other internal links keep
+# their label, external links are dropped
+_RE_LINK = regex_engine.compile(
+    r'(?i)\[\[(?:File|Image|ملف|صورة|Category|تصنيف):[^\]]*\]\]'
+    r'|\[\[(?:[^\]|]*\|)?(?P<label>[^\]]*)\]\]'
+    r'|\[http[^\]]*\]'
+)
+# References with a body (attributes must not end in '/'), then any other tag
+_RE_MARKUP = regex_engine.compile(r'(?s)<ref(?:\s[^>]*[^/>])?>.*?</ref>|<[^>]+>')
+_RE_NEWLINES = regex_engine.compile(r'\n+')
+_RE_SPACES = regex_engine.compile(r' +')
+
+def _link_replacement(match) -> str:
+    """Keep the label of internal links, drop everything else."""
+    return match.group('label') or ''
+
+def strip_templates(text: str) -> str:
+    """
+    🧹 Remove {{ }} templates, including nested ones, in a single pass
+    
+    Unterminated templates are left in place.
+    """
+    if '{{' not in text:
+        return text
+    
+    parts = []
+    keep_from = 0  # start of the text after the last removed template
+    depth = 0
+    pos = 0
+    next_open = text.find('{{')
+    next_close = text.find('}}')
+    
+    while True:
+        if next_open != -1 and next_open < pos:
+            next_open = text.find('{{', pos)
+        if next_close != -1 and next_close < pos:
+            next_close = text.find('}}', pos)
+        
+        if depth == 0:
+            if next_open == -1:
+                break
+            parts.append(text[keep_from:next_open])
+            keep_from = next_open
+            depth = 1
+            pos = next_open + 2
+        elif next_close == -1:
+            break
+        elif next_open != -1 and next_open < next_close:
+            depth += 1
+            pos = next_open + 2
+        else:
+            depth -= 1
+            pos = next_close + 2
+            if depth == 0:
+                keep_from = pos
+    
+    parts.append(text[keep_from:])
+    return ''.join(parts)
+
+def clean_wikitext(text: str) -> str:
+    """
+    🧹 Clean Wikipedia markup from text
+    
+    Args:
+        text: Raw Wikipedia article text with markup
+    
+    Returns:
+        Clean text without markup
+    """
+    # Remove templates {{ }}
+    text = strip_templates(text)
+    
+    # Internal, file, category and external links in one pass
+    text = _RE_LINK.sub(_link_replacement, text)
+    
+    # Remove references <ref>...</ref> and HTML tags
+    text = _RE_MARKUP.sub('', text)
+    
+    # Clean up extra whitespace
+    text = _RE_NEWLINES.sub('\n', text)
+    text = _RE_SPACES.sub(' ', text)
+    text = text.strip()
+    
+    return text
+
+def is_article_candidate(page: bytes) -> bool:
+    """
+    🔎 Cheap pre-filter on a raw <page> element, before any parsing or cleaning
+    
+    Rejects other namespaces, redirects, disambiguation pages and pages whose
+    raw text is already shorter than MIN_ARTICLE_LENGTH. Cleaning only
+    shrinks text (and XML escaping only grows the raw bytes), so that length
+    check never drops a page extract_article would keep.
+    """
+    if MAIN_NAMESPACE not in page or b'<redirect' in page:
+        return False
+    
+    # Locate the revision text: <text ...>...</text> (empty pages use <text ... />)
+    text_tag = page.find(b'<text')
+    if text_tag == -1:
+        return False
+    text_start = page.find(b'>', text_tag) + 1
+    text_end = page.rfind(b'</text>')
+    if text_start == 0 or text_end < text_start:
+        return False
+    if text_end - text_start < MIN_ARTICLE_LENGTH:
+        return False
+    
+    if page[text_start:text_end].lstrip()[:16].startswith(REDIRECT_PREFIXES):
+        return False
+    
+    return not any(page.find(template, text_start, text_end) != -1 for template in DISAMBIGUATION_TEMPLATES)
+
+def extract_article(page: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+    """
+    📄 Build a clean article from a Wikipedia page's title and raw wikitext
+    
+    Module-level so multiprocessing workers can run it.
+    
+    Args:
+        page: (title, raw wikitext of the latest revision)
+    
+    Returns:
+        Dictionary with article title and clean text, or None if skipped
+    """
+    title, raw_text = page
+    if not raw_text:
+        return None
+    
+    # Skip redirects
+    if raw_text.strip().startswith('#تحويل') or raw_text.strip().startswith('#REDIRECT'):
+        return None
+    
+    # Clean the text
+    clean_text = clean_wikitext(raw_text)
+    
+    # Skip very short articles
+    if len(clean_text.strip()) < MIN_ARTICLE_LENGTH:
+        return None
+    
+    return {
+        'title': title or "Untitled",
+        'text': clean_text,
+        'length': len(clean_text)
+    }
+
+@contextmanager
+def open_dump(dump_file: str):
+    """
+    📂 Open a .bz2 dump as a binary stream, decompressing on all cores when possible
+    
+    Prefers indexed_bzip2, then an lbzip2/pbzip2 subprocess, and falls back
+    to the single-threaded stdlib bz2 module.
+    """
+    if indexed_bzip2 is not None:
+        with indexed_bzip2.open(dump_file, parallelization=os.cpu_count() or 1) as f:
+            yield f
+        return
+    
+    tool = shutil.which('lbzip2') or shutil.which('pbzip2')
+    if tool is None:
+        with bz2.open(dump_file, 'rb') as f:
+            yield f
+        return
+    
+    if not os.path.exists(dump_file):
+        raise FileNotFoundError(dump_file)
+    
+    proc = subprocess.Popen([tool, '-dc', dump_file], stdout=subprocess.PIPE)
+    try:
+        yield proc.stdout
+    finally:
+        # Closing the pipe stops the decompressor (SIGPIPE) if we stopped early
+        proc.stdout.close()
+        if proc.wait() > 0:
+            raise IOError(f"{os.path.basename(tool)} failed to decompress {dump_file}")
+
+def _decompress_dump(dump_file: str, chunks: queue.Queue, stop: threading.Event):
+    """Producer thread: push decompressed chunks of the dump, then None (or the error)."""
+    try:
+        with open_dump(dump_file) as f:
+            while not stop.is_set():
+                chunk = f.read(DECOMPRESS_CHUNK_SIZE)
+                if not chunk:
+                    break
+                # Time out now and then so an abandoned consumer cannot block us forever
+                while not stop.is_set():
+                    try:
+                        chunks.put(chunk, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+        item = None
+    except Exception as e:
+        item = e
+    
+    while not stop.is_set():
+        try:
+            chunks.put(item, timeout=0.5)
+            return
+        except queue.Full:
+            continue
+
+def _drain_queue(chunks: queue.Queue) -> Iterator[bytes]:
+    """Yield chunks pushed by _decompress_dump until it signals the end (or an error)."""
+    while True:
+        chunk = chunks.get()
+        if chunk is None:
+            return
+        if isinstance(chunk, Exception):
+            raise chunk
+        yield chunk
+
+def split_pages(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    ✂️ Cut raw <page>...</page> elements out of a stream of decompressed bytes
+    
+    Page boundaries are found with bytes.find (a C-level memmem), so nothing
+    is split into lines or decoded; pages may span chunk boundaries.
+    """
+    buf = b''
+    for chunk in chunks:
+        buf += chunk
+        pos = 0
+        while True:
+            start = buf.find(PAGE_START, pos)
+            if start == -1:
+                # Keep a tail in case the next chunk completes a split '<page>'
+                pos = max(pos, len(buf) - len(PAGE_START) + 1)
+                break
+            end = buf.find(PAGE_END, start)
+            if end == -1:
+                pos = start
+                break
+            end += len(PAGE_END)
+            yield buf[start:end]
+            pos = end
+        # Drop consumed bytes so the buffer only holds the unfinished page
+        buf = buf[pos:]
 
 class WikipediaProcessor:
     """🚀 Process Arabic Wikipedia dump for ARQA system"""
     
-    def __init__(self, output_dir: str = "wikipedia_processed"):
+    def __init__(self, output_dir: str = "wikipedia_processed", quiet: bool = False):
         self.output_dir = output_dir
+        self.quiet = quiet or os.environ.get('ARQA_QUIET') == '1'
+        
+        # Imported here so pool workers and early exits skip BeautifulSoup/PyArabic
+        from arqa.simple_ingest import SimpleDocumentIngestor
         self.ingestor = SimpleDocumentIngestor(output_dir=output_dir)
         self.stats = {
             'articles_processed': 0,
@@ -37,146 +331,97 @@ class WikipediaProcessor:
         os.makedirs(output_dir, exist_ok=True)
     
     def clean_wikitext(self, text: str) -> str:
+        """🧹 Clean Wikipedia markup from text"""
+        return clean_wikitext(text)
+    
+    def extract_article(self, title: str, raw_text: str) -> Optional[Dict[str, Any]]:
+        """📄 Build a clean article from a page's title and raw wikitext"""
+        return extract_article((title, raw_text))
+    
+    def iter_raw_pages(self, dump_file: str) -> Iterator[Tuple[str, str]]:
         """
-        🧹 Clean Wikipedia markup from text
+        📖 Stream (title, raw wikitext) for every candidate article page in the dump
         
-        Args:
-            text: Raw Wikipedia article text with markup
-            
-        Returns:
-            Clean text without markup
+        A background thread decompresses the bz2 file while this thread cuts
+        <page> elements out of the raw bytes and parses each one with lxml, so
+        decompression overlaps with parsing and cleaning.
         """
-        # Remove common Wikipedia markup patterns
-        # Remove templates {{ }}
-        text = re.sub(r'\{\{[^}]*\}\}', '', text)
-        
-        # Remove internal links [[ ]] but keep the text
-        text = re.sub(r'\[\[([^\]|]*\|)?([^\]]*)\]\]', r'\2', text)
+        chunks = queue.Queue(maxsize=DECOMPRESS_QUEUE_SIZE)
+        stop = threading.Event()
+        reader = threading.Thread(target=_decompress_dump, args=(dump_file, chunks, stop), daemon=True)
+        reader.start()
         
-        # Remove external links
-        text = re.sub(r'\[http[^\]]*\]', '', text)
+        parser = etree.XMLParser(huge_tree=True)
         
-        # Remove references <ref>...</ref>
-        text = re.sub(r'<ref[^>]*>.*?</ref>', '', text, flags=re.DOTALL)
-        text = re.sub(r'<ref[^>]*/?>', '', text)
-        
-        # Remove HTML tags
-        text = re.sub(r'<[^>]+>', '', text)
-        
-        # Remove file/image links
-        text = re.sub(r'\[\[(File|Image|ملف|صورة):[^\]]*\]\]', '', text, flags=re.IGNORECASE)
-        
-        # Remove categories
-        text = re.sub(r'\[\[(Category|تصنيف):[^\]]*\]\]', '', text, flags=re.IGNORECASE)
-        
-        # Clean up extra whitespace
-        text = re.sub(r'\n+', '\n', text)
-        text = re.sub(r' +', ' ', text)
-        text = text.strip()
-        
-        return text
-    
-    def extract_article_from_xml(self, page_xml: str) -> Dict[str, Any]:
-        """
-        📄 Extract article content from Wikipedia XML page
-        
-        Args:
-            page_xml: XML content of a single Wikipedia page
-            
-        Returns:
-            Dictionary with article title and clean text
-        """
         try:
-            # Parse XML
-            root = ET.fromstring(f"<root>{page_xml}</root>")
-            
-            # Extract title
-            title_elem = root.find('.//title')
-            title = title_elem.text if title_elem is not None else "Untitled"
-            
-            # Extract text content
-            text_elem = root.find('.//text')
-            if text_elem is None or not text_elem.text:
-                return None
-            
-            raw_text = text_elem.text
-            
-            # Skip redirects
-            if raw_text.strip().startswith('#تحويل') or raw_text.strip().startswith('#REDIRECT'):
-                return None
-            
-            # Clean the text
-            clean_text = self.clean_wikitext(raw_text)
-            
-            # Skip very short articles
-            if len(clean_text.strip()) < 100:
-                return None
-            
-            return {
-                'title': title,
-                'text': clean_text,
-                'length': len(clean_text)
-            }
-            
-        except Exception as e:
-            print(f"❌ Error parsing article XML: {e}")
-            return None
+            for page_bytes in split_pages(_drain_queue(chunks)):
+                # Skip redirects, stubs and non-articles without parsing them
+                if is_article_candidate(page_bytes):
+                    try:
+                        page = etree.fromstring(page_bytes, parser)
+                    except etree.XMLSyntaxError:
+                        # A malformed page is skipped, not fatal to the whole dump
+                        self.stats['articles_skipped'] += 1
+                        continue
+                    yield page.findtext('title'), page.findtext('revision/text')
+        finally:
+            # Unblock the reader if we stopped early (e.g. max_articles reached)
+            stop.set()
     
-    def parse_wikipedia_dump(self, dump_file: str, max_articles: int = None) -> Iterator[Dict[str, Any]]:
+    def parse_wikipedia_dump(self, dump_file: str, max_articles: int = None,
+                             workers: Optional[int] = None,
+                             skip_titles: Optional[Set[str]] = None) -> Iterator[Dict[str, Any]]:
         """
         📖 Parse Wikipedia dump file and yield articles
         
+        Pages are read in the main process and cleaned by a pool of worker
+        processes, in bounded windows so the parser never runs far ahead.
+        
         Args:
             dump_file: Path to .bz2 Wikipedia dump file
             max_articles: Maximum number of articles to process (None for all)
+            workers: Number of cleaning processes (default: all CPU cores)
+            skip_titles: Titles already written by an earlier run; they are not
+                cleaned again but still count towards max_articles
             
         Yields:
-            Dictionary with article data
+            Dictionary with article data, in dump order
         """
         print(f"🚀 Starting to parse Wikipedia dump: {dump_file}")
         
+        workers = workers or os.cpu_count() or 1
+        window_size = workers * CLEAN_CHUNKSIZE * 4
+        raw_pages = self.iter_raw_pages(dump_file)
         article_count = 0
-        current_page = []
-        in_page = False
         
-        # Open compressed file
-        with bz2.open(dump_file, 'rt', encoding='utf-8') as f:
-            for line_num, line in enumerate(f):
-                line = line.strip()
+        with Pool(processes=workers) as pool:
+            while True:
+                window = list(islice(raw_pages, window_size))
+                if not window:
+                    break
                 
-                # Track pages
-                if '<page>' in line:
-                    in_page = True
-                    current_page = ['<page>']
-                elif '</page>' in line:
-                    current_page.append('</page>')
-                    
-                    # Process complete page
-                    page_xml = '\n'.join(current_page)
-                    article = self.extract_article_from_xml(page_xml)
-                    
-                    if article:
-                        article_count += 1
-                        yield article
-                        
-                        if article_count % 1000 == 0:
-                            print(f"📄 Processed {article_count} articles...")
-                        
-                        if max_articles and article_count >= max_articles:
-                            print(f"🔚 Reached maximum articles limit: {max_articles}")
-                            break
+                # Resumed run: skip articles that are already on disk
+                if skip_titles:
+                    remaining = [page for page in window if page[0] not in skip_titles]
+                    article_count += len(window) - len(remaining)
+                    window = remaining
+                    if max_articles and article_count >= max_articles:
+                        print(f"🔚 Reached maximum articles limit: {max_articles}")
+                        return
+                
+                for article in pool.imap(extract_article, window, chunksize=CLEAN_CHUNKSIZE):
+                    if not article:
+                        continue
                     
-                    in_page = False
-                    current_page = []
+                    article_count += 1
+                    yield article
                     
-                elif in_page:
-                    current_page.append(line)
-                
-                # Progress indicator for large files
-                if line_num % 100000 == 0:
-                    print(f"⚡ Processed {line_num:,} lines...")
+                    if max_articles and article_count >= max_articles:
+                        print(f"🔚 Reached maximum articles limit: {max_articles}")
+                        return
     
-    def process_wikipedia_dump(self, dump_file: str, max_articles: int = None, batch_size: int = 100):
+    def process_wikipedia_dump(self, dump_file: str, max_articles: int = None, batch_size: int = 100,
+                               workers: Optional[int] = None, resume: bool = False):
         """
         🏭 Process entire Wikipedia dump and create ARQA documents
         
@@ -184,6 +429,8 @@ class WikipediaProcessor:
             dump_file: Path to .bz2 Wikipedia dump file
             max_articles: Maximum number of articles to process
             batch_size: Number of articles to process in each batch
+            workers: Number of cleaning processes (default: all CPU cores)
+            resume: Keep the existing output and skip articles already in it
         """
         print(f"🚀 Processing Arabic Wikipedia Dump")
         print(f"📁 Input: {dump_file}")
@@ -193,21 +440,37 @@ class WikipediaProcessor:
         
         self.stats['start_time'] = datetime.now()
         
+        batch_path = os.path.join(self.output_dir, BATCH_FILE)
+        if resume and os.path.exists(batch_path):
+            done_titles = self._load_completed_titles(batch_path)
+            print(f"⏩ Resuming: {len(done_titles):,} articles already processed")
+        else:
+            # Start a fresh output file; batches are appended to it
+            open(batch_path, 'wb').close()
+            done_titles = None
+        
         # Process articles in batches
         batch_articles = []
+        pbar = tqdm(total=max_articles, initial=len(done_titles) if done_titles else 0, unit='article',
+                    desc="📄 Articles", mininterval=PROGRESS_MININTERVAL,
+                    disable=True if self.quiet else None)
         
         try:
-            for article in self.parse_wikipedia_dump(dump_file, max_articles):
-                batch_articles.append(article)
+            with open(batch_path, 'ab') as sink:
+                for article in self.parse_wikipedia_dump(dump_file, max_articles, workers, done_titles):
+                    batch_articles.append(article)
+                    pbar.update(1)
+                    
+                    # Process batch when full
+                    if len(batch_articles) >= batch_size:
+                        self._process_article_batch(batch_articles, sink)
+                        batch_articles = []
+                        pbar.set_postfix(chunks=self.stats['chunks_created'], skipped=self.stats['articles_skipped'],
+                                         refresh=False)
                 
-                # Process batch when full
-                if len(batch_articles) >= batch_size:
-                    self._process_article_batch(batch_articles)
-                    batch_articles = []
-            
-            # Process remaining articles
-            if batch_articles:
-                self._process_article_batch(batch_articles)
+                # Process remaining articles
+                if batch_articles:
+                    self._process_article_batch(batch_articles, sink)
                 
         except KeyboardInterrupt:
             print(f"\n⚠️ Processing interrupted by user")
@@ -215,35 +478,54 @@ class WikipediaProcessor:
             print(f"\n❌ Processing error: {e}")
             self.stats['processing_errors'] += 1
         
+        pbar.close()
+        
         # Save final statistics
         self._save_statistics()
         self._print_final_stats()
     
-    def _process_article_batch(self, articles: List[Dict[str, Any]]):
-        """Process a batch of articles"""
-        all_documents = []
+    def _load_completed_titles(self, batch_path: str) -> Set[str]:
+        """
+        📋 Titles whose last chunk is already in the output file
         
+        A batch cut off by a crash can leave a partial last line or the
+        first chunks of an unfinished article; the file is truncated after
+        the last complete article, which is then processed again in full.
+        """
+        done_titles = set()
+        with open(batch_path, 'rb+') as f:
+            read_bytes = complete_bytes = 0
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                read_bytes += len(line)
+                metadata = orjson.loads(line)['metadata']
+                # An article's chunks are written consecutively, ending with its last one
+                if metadata['chunk_id'] == metadata['total_chunks'] - 1:
+                    done_titles.add(metadata['title'])
+                    complete_bytes = read_bytes
+            f.truncate(complete_bytes)
+        return done_titles
+    
+    def _iter_article_documents(self, articles: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Yield document chunks article by article, updating the stats"""
         for article in articles:
             try:
-                # Create XML content for processing
-                xml_content = f"""<?xml version="1.0" encoding="UTF-8"?>
-<article>
-    <title>{article['title']}</title>
-    <content>
-        {article['text']}
-    </content>
-</article>"""
-                
-                # Process with ingestor
-                documents = self.ingestor.process_xml_content(
-                    xml_content, 
+                # Article is already clean text; chunk it directly
+                documents = self.ingestor.chunk_text(
+                    article['title'],
+                    article['text'],
                     source_url=f"wikipedia:{article['title']}"
                 )
                 
-                if documents:
-                    all_documents.extend(documents)
+                chunk_count = 0
+                for doc in documents:
+                    chunk_count += 1
+                    yield doc
+                
+                if chunk_count:
                     self.stats['articles_processed'] += 1
-                    self.stats['chunks_created'] += len(documents)
+                    self.stats['chunks_created'] += chunk_count
                 else:
                     self.stats['articles_skipped'] += 1
                     
@@ -251,16 +533,12 @@ class WikipediaProcessor:
                 print(f"❌ Error processing article '{article['title']}': {e}")
                 self.stats['articles_skipped'] += 1
                 self.stats['processing_errors'] += 1
-        
-        # Save batch documents
-        if all_documents:
-            batch_filename = f"wikipedia_batch_{self.stats['articles_processed']//100:04d}.json"
-            batch_path = os.path.join(self.output_dir, batch_filename)
-            
-            with open(batch_path, 'w', encoding='utf-8') as f:
-                json.dump(all_documents, f, ensure_ascii=False, indent=2)
-            
-            print(f"💾 Saved batch: {len(all_documents)} chunks to {batch_filename}")
+    
+    def _process_article_batch(self, articles: List[Dict[str, Any]], sink: BinaryIO):
+        """Process a batch of articles, writing each chunk to the sink as it is produced"""
+        sink.writelines(orjson.dumps(doc) + b'\n' for doc in self._iter_article_documents(articles))
+        # Flush per batch so a resumed run sees every finished batch
+        sink.flush()
     
     def _save_statistics(self):
         """Save processing statistics"""
@@ -268,8 +546,8 @@ class WikipediaProcessor:
             self.stats['total_time'] = (datetime.now() - self.stats['start_time']).total_seconds()
         
         stats_file = os.path.join(self.output_dir, "wikipedia_processing_stats.json")
-        with open(stats_file, 'w', encoding='utf-8') as f:
-            json.dump(self.stats, f, ensure_ascii=False, indent=2, default=str)
+        with open(stats_file, 'wb') as f:
+            f.write(orjson.dumps(self.stats, default=str, option=orjson.OPT_INDENT_2))
     
     def _print_final_stats(self):
         """Print final processing statistics"""
@@ -289,34 +567,71 @@ class WikipediaProcessor:
         
         print(f"📁 Output directory: {self.output_dir}")
 
-def main():
-    """Main function to process Wikipedia dump"""
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Command line options; a resumed run reuses the options saved in the output directory"""
+    parser = argparse.ArgumentParser(description="Process the Arabic Wikipedia dump into ARQA documents")
+    parser.add_argument('--dump-file', default="arwiki-latest-pages-articles.xml.bz2",
+                        help="Path to the .bz2 Wikipedia dump")
+    parser.add_argument('--output-dir', default="wikipedia_processed",
+                        help="Directory for the JSONL chunks and statistics")
+    parser.add_argument('--max-articles', type=int, default=None,
+                        help="Stop after this many articles (default: all)")
+    parser.add_argument('--batch-size', type=int, default=50,
+                        help="Articles per batch written to disk")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Cleaning processes (default: all CPU cores)")
+    parser.add_argument('--test', action='store_true',
+                        help="Test mode: 1000 articles into wikipedia_test")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue an interrupted run in --output-dir")
+    parser.add_argument('--quiet', action='store_true',
+                        help="No progress bar (also: ARQA_QUIET=1)")
+    args = parser.parse_args(argv)
     
-    # Configuration
-    dump_file = "arwiki-latest-pages-articles.xml.bz2"
-    output_dir = "wikipedia_processed"
-    max_articles = None  # Set to a number for testing, None for all articles
+    if args.test:
+        args.max_articles = args.max_articles or 1000
+        if args.output_dir == parser.get_default('output_dir'):
+            args.output_dir = "wikipedia_test"
     
-    # For testing, you might want to start with a smaller number
-    test_mode = input("Test mode with 1000 articles? (y/n): ").lower().strip() == 'y'
-    if test_mode:
-        max_articles = 1000
-        output_dir = "wikipedia_test"
+    # Options from the interrupted run win over defaults, not over explicit flags
+    config_file = os.path.join(args.output_dir, RUN_CONFIG_FILE)
+    if args.resume and os.path.exists(config_file):
+        with open(config_file, 'rb') as f:
+            saved = orjson.loads(f.read())
+        parser.set_defaults(**{k: v for k, v in saved.items() if k not in ('resume', 'test', 'quiet')})
+        args = parser.parse_args(argv)
+    
+    return args
+
+def main(argv: Optional[List[str]] = None):
+    """Main function to process Wikipedia dump"""
+    args = parse_args(argv)
+    
+    # No options on an interactive terminal: keep the old test mode prompt
+    if argv is None and len(sys.argv) == 1 and sys.stdin.isatty():
+        if input("Test mode with 1000 articles? (y/n): ").lower().strip() == 'y':
+            args = parse_args(['--test'])
     
     # Check if dump file exists
-    if not os.path.exists(dump_file):
-        print(f"❌ Wikipedia dump file not found: {dump_file}")
-        print(f"💡 Make sure the file is in the current directory")
+    if not os.path.exists(args.dump_file):
+        print(f"❌ Wikipedia dump file not found: {args.dump_file}")
+        print(f"💡 Make sure the file is in the current directory or pass --dump-file")
         return
     
     # Create processor and start
-    processor = WikipediaProcessor(output_dir=output_dir)
+    processor = WikipediaProcessor(output_dir=args.output_dir, quiet=args.quiet)
+    
+    # Save the options so --resume can pick them up
+    with open(os.path.join(args.output_dir, RUN_CONFIG_FILE), 'wb') as f:
+        f.write(orjson.dumps(vars(args), option=orjson.OPT_INDENT_2))
     
     try:
         processor.process_wikipedia_dump(
-            dump_file=dump_file,
-            max_articles=max_articles,
-            batch_size=50  # Smaller batches for better memory management
+            dump_file=args.dump_file,
+            max_articles=args.max_articles,
+            batch_size=args.batch_size,  # Smaller batches for better memory management
+            workers=args.workers,
+            resume=args.resume
         )
     except KeyboardInterrupt:
         print(f"\n⚠️ Processing interrupted by user")
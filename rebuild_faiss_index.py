@@ -6,19 +6,37 @@ Update the FAISS index to include all documents from documents_metadata.json
 
 import os
 import sys
-import json
+import argparse
+import shutil
+from itertools import islice
+
 from typing import List, Dict, Any
 
 # Add project root to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
+# Rebuilt documents are written here, then moved over documents_metadata.json
+REBUILD_DOCUMENTS_PATH = "./documents_metadata.rebuild.json"
+
+def parse_args():
+    """Command line options for headless rebuilds"""
+    parser = argparse.ArgumentParser(description="Rebuild the ARQA FAISS index from documents_metadata.json")
+    parser.add_argument('--force', action='store_true',
+                        help="Rebuild even if the index already has every document")
+    parser.add_argument('-y', '--assume-yes', action='store_true',
+                        help="Do not ask for confirmation")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+    
     print("🔧 ARQA FAISS Index Rebuild")
     print("=" * 60)
     
     # Import the retriever
     try:
-        from arqa.retriever_optimized_fixed import OptimizedArabicRetriever
+        from arqa.retriever_optimized_fixed import OptimizedArabicRetriever, choose_index_factory
+        from arqa.document_store import iter_documents, count_documents, move_documents, read_header_value, shard_directory
         print("✅ Successfully imported OptimizedArabicRetriever")
     except ImportError as e:
         print(f"❌ Error importing retriever: {e}")
@@ -29,13 +47,11 @@ def main():
     print(f"📁 Loading documents from: {metadata_file}")
     
     try:
-        with open(metadata_file, 'r', encoding='utf-8') as f:
-            metadata = json.load(f)
-        
-        documents = metadata.get('documents', [])
-        model_name = metadata.get('model_name', 'abdoelsayed/AraDPR')
+        # Only the header and the document count: documents are streamed while indexing
+        num_documents = count_documents(metadata_file)
+        model_name = read_header_value(metadata_file, 'model_name', 'abdoelsayed/AraDPR')
         
-        print(f"✅ Loaded {len(documents):,} documents")
+        print(f"✅ Found {num_documents:,} documents")
         print(f"🤖 Model: {model_name}")
         
     except FileNotFoundError:
@@ -45,35 +61,51 @@ def main():
         print(f"❌ Error loading metadata: {e}")
         return
     
-    # Initialize retriever (this will create a fresh index)
+    # A rebuild interrupted earlier may have left partial documents behind
+    if os.path.exists(REBUILD_DOCUMENTS_PATH):
+        os.remove(REBUILD_DOCUMENTS_PATH)
+    if os.path.isdir(shard_directory(REBUILD_DOCUMENTS_PATH)):
+        shutil.rmtree(shard_directory(REBUILD_DOCUMENTS_PATH))
+    
+    # Initialize retriever (this will create a fresh index). It points at the
+    # rebuild path, so the existing corpus is never loaded into memory
     print(f"\n🔧 Initializing retriever...")
+    index_factory = choose_index_factory(num_documents)
     try:
         retriever = OptimizedArabicRetriever(
             model_name=model_name,
             index_path="./faiss_index",
-            documents_path="./documents_metadata.json",
+            documents_path=REBUILD_DOCUMENTS_PATH,
             batch_size=64,  # Larger batch for faster processing
-            device="auto"
+            device="auto",
+            index_factory=index_factory,  # IVF-PQ for Wikipedia-sized corpora
+            nprobe=16,
+            train_sample_size=256000
         )
         print(f"✅ Retriever initialized")
         
+        # Embedding dominates rebuild time: use the largest batch that fits in VRAM
+        if retriever.device == "cuda":
+            retriever.find_max_batch_size()
+        
     except Exception as e:
         print(f"❌ Error initializing retriever: {e}")
         return
     
     # Check current index status
-    current_docs = len(retriever.documents) if hasattr(retriever, 'documents') else 0
+    current_docs = retriever.index.ntotal if retriever.index else 0
     print(f"📊 Current index contains: {current_docs:,} documents")
-    print(f"📊 Metadata contains: {len(documents):,} documents")
+    print(f"📊 Metadata contains: {num_documents:,} documents")
     
-    if current_docs == len(documents):
-        print("✅ Index is already up to date!")
+    if current_docs == num_documents and not args.force:
+        print("✅ Index is already up to date! (use --force to rebuild anyway)")
         return
     
     # Confirm rebuild
     print(f"\n🎯 Rebuild Plan:")
-    print(f"   📄 Documents to index: {len(documents):,}")
+    print(f"   📄 Documents to index: {num_documents:,}")
     print(f"   🤖 Model: {model_name}")
+    print(f"   🧮 Index type: {index_factory}")
     print(f"   📁 Index path: ./faiss_index.faiss")
     
     # Clear existing index if it exists
@@ -85,29 +117,45 @@ def main():
         except Exception as e:
             print(f"⚠️ Could not remove existing index: {e}")
     
-    # Reset retriever to clear any loaded data
+    # Drop the loaded index; the new documents are written next to the old
+    # ones and swapped in once indexing finishes
     retriever.index = None
-    retriever.documents = []
-    retriever.id_to_doc = {}
-    retriever.document_hashes = set()
     
-    confirm = input(f"\n✅ Proceed with rebuilding the index? (y/n): ").lower().strip()
-    if confirm != 'y':
-        print("❌ Index rebuild cancelled")
-        return
+    if not args.assume_yes:
+        if not sys.stdin.isatty():
+            print("❌ Rebuild needs confirmation: pass --assume-yes")
+            return
+        confirm = input(f"\n✅ Proceed with rebuilding the index? (y/n): ").lower().strip()
+        if confirm != 'y':
+            print("❌ Index rebuild cancelled")
+            return
     
     # Add all documents
     print(f"\n🚀 Starting index rebuild...")
     try:
-        result = retriever.add_documents_incremental(
-            documents=documents,
-            background=False,  # Process immediately
-            force_reindex=True  # Force reindexing even if documents exist
-        )
+        # Stream documents in slices; the first slice is large enough to train IVF-PQ
+        documents = iter_documents(metadata_file)
+        processed, processing_time, wikipedia_count = 0, 0.0, 0
+        while True:
+            batch = list(islice(documents, retriever.train_sample_size))
+            if not batch:
+                break
+            wikipedia_count += sum(1 for doc in batch if doc.get('meta', {}).get('source') == 'wikipedia')
+            result = retriever.add_documents_incremental(
+                documents=batch,
+                background=False,  # Process immediately
+                force_reindex=True  # Force reindexing even if documents exist
+            )
+            processed += result.get('new_documents', 0)
+            processing_time += result.get('processing_time', 0)
+        
+        # Swap the rebuilt documents in for the old ones
+        move_documents(REBUILD_DOCUMENTS_PATH, metadata_file)
+        retriever.documents_path = metadata_file
         
         print(f"\n🎉 Index Rebuild Complete!")
-        print(f"✅ Processed documents: {result.get('new_documents', 0):,}")
-        print(f"⏱️ Processing time: {result.get('processing_time', 0):.2f} seconds")
+        print(f"✅ Processed documents: {processed:,}")
+        print(f"⏱️ Processing time: {processing_time:.2f} seconds")
         
         # Verify the rebuilt index
         print(f"\n🔍 Verifying rebuilt index...")
@@ -119,10 +167,10 @@ def main():
         print(f"   📊 Index size: {index_size:,}")
         print(f"   ✅ Match: {final_count == index_size}")
         
-        if final_count == len(documents):
-            print(f"🎯 Success! Index contains all {len(documents):,} documents")
+        if final_count == num_documents:
+            print(f"🎯 Success! Index contains all {num_documents:,} documents")
         else:
-            print(f"⚠️ Warning: Expected {len(documents):,} documents, but index has {final_count:,}")
+            print(f"⚠️ Warning: Expected {num_documents:,} documents, but index has {final_count:,}")
         
         # Test search functionality
         print(f"\n🧪 Testing search functionality...")
@@ -132,7 +180,7 @@ def main():
             
             print(f"✅ Search test successful! Found {len(results)} results for: {test_query}")
             for i, result in enumerate(results, 1):
-                title = result.metadata.get('title', 'Unknown')
+                title = result.meta.get('title', 'Unknown')
                 score = result.score
                 print(f"   {i}. [{title}] (Score: {score:.3f})")
                 
@@ -146,8 +194,8 @@ def main():
         return
     
     print(f"\n🚀 FAISS Index Successfully Rebuilt!")
-    print(f"📄 Your ARQA system now has access to all {len(documents):,} documents")
-    print(f"🌟 Including {len([d for d in documents if d.get('meta', {}).get('source') == 'wikipedia']):,} Wikipedia articles!")
+    print(f"📄 Your ARQA system now has access to all {num_documents:,} documents")
+    print(f"🌟 Including {wikipedia_count:,} Wikipedia articles!")
 
 if __name__ == "__main__":
     main()
@@ -6,28 +6,37 @@ Simple script to run the FastAPI server with proper imports
 
 import sys
 import os
+from importlib.util import find_spec
 
 # Add the project root to Python path
 project_root = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, project_root)
 
-# Import and run the API
-try:
-    from src.arqa.api_optimized import app
-except ImportError:
-    from src.arqa.api import app
+# Run the API as an import string: uvicorn imports it (and loads torch, FAISS
+# and the models) in the server process, so the launcher itself starts instantly
+if find_spec("src.arqa.api_optimized") is not None:
+    app_path = "src.arqa.api_optimized:app"
+else:
+    app_path = "src.arqa.api:app"
 import uvicorn
 
+# ARQA_DEV=1: auto-reload for development (single process)
+# Otherwise: no reload, ARQA_WORKERS processes (each loads its own models)
+DEV_MODE = os.environ.get("ARQA_DEV") == "1"
+WORKERS = 1 if DEV_MODE else int(os.environ.get("ARQA_WORKERS", "1"))
+
 if __name__ == "__main__":
     print("🚀 Starting ARQA API Server...")    
     print(f"📁 Project root: {project_root}")
     print("🌐 Server will be available at: http://localhost:8000")
     print("📖 API documentation at: http://localhost:8000/docs")
+    print(f"⚙️ Mode: {'development (reload)' if DEV_MODE else f'production ({WORKERS} worker(s))'}")
     print()
     
     uvicorn.run(
-        app, 
+        app_path, 
         host="0.0.0.0", 
         port=8000, 
-        reload=False
+        reload=DEV_MODE,
+        workers=WORKERS
     )
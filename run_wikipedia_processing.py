@@ -8,19 +8,47 @@ import os
 import sys
 import json
 import time
+import argparse
 from datetime import datetime
 
 # Add project root to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
+# Run presets: max_articles, output_dir, batch_size, description
+RUN_OPTIONS = {
+    '1': (1000, "wikipedia_test", 50, "Test run"),
+    '2': (10000, "wikipedia_medium", 100, "Medium run"),
+    '3': (100000, "wikipedia_large", 200, "Large run"),
+    '4': (None, "wikipedia_full", 500, "FULL processing"),
+}
+OPTION_NAMES = {'test': '1', 'medium': '2', 'large': '3', 'full': '4'}
+
+def parse_args():
+    """Command line options for headless runs (nohup, schedulers)"""
+    parser = argparse.ArgumentParser(description="Process the full Arabic Wikipedia dump for ARQA")
+    parser.add_argument('--option', choices=list(RUN_OPTIONS) + list(OPTION_NAMES),
+                        help="Run size: 1/test, 2/medium, 3/large, 4/full (prompted if omitted)")
+    parser.add_argument('--dump-file', default="arwiki-latest-pages-articles.xml.bz2",
+                        help="Path to the .bz2 Wikipedia dump")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Cleaning processes (default: all CPU cores)")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue an interrupted run of the same option")
+    parser.add_argument('-y', '--assume-yes', action='store_true',
+                        help="Do not ask for confirmation on large runs")
+    parser.add_argument('--quiet', action='store_true',
+                        help="No progress bar (also: ARQA_QUIET=1)")
+    return parser.parse_args()
+
 def main():
     """Main production processing function"""
+    args = parse_args()
     
     print("🚀 ARQA Wikipedia Production Processing")
     print("=" * 60)
     
     # Configuration
-    dump_file = "arwiki-latest-pages-articles.xml.bz2"
+    dump_file = args.dump_file
     
     if not os.path.exists(dump_file):
         print(f"❌ Wikipedia dump file not found: {dump_file}")
@@ -31,39 +59,26 @@ def main():
     file_size = os.path.getsize(dump_file) / (1024 * 1024 * 1024)  # GB
     print(f"📁 File size: {file_size:.2f} GB")
     
-    # Processing options
-    print(f"\n📋 Processing Options:")
-    print(f"1. Test run (1,000 articles)")
-    print(f"2. Medium run (10,000 articles)")
-    print(f"3. Large run (100,000 articles)")
-    print(f"4. Full processing (ALL articles - may take hours)")
-    
-    choice = input(f"\nSelect option (1-4): ").strip()
+    choice = OPTION_NAMES.get(args.option, args.option)
+    if choice is None:
+        if not sys.stdin.isatty():
+            print("❌ No --option given and no terminal to ask on")
+            return
+        
+        # Processing options
+        print(f"\n📋 Processing Options:")
+        print(f"1. Test run (1,000 articles)")
+        print(f"2. Medium run (10,000 articles)")
+        print(f"3. Large run (100,000 articles)")
+        print(f"4. Full processing (ALL articles - may take hours)")
+        
+        choice = input(f"\nSelect option (1-4): ").strip()
     
     # Configure based on choice
-    if choice == '1':
-        max_articles = 1000
-        output_dir = "wikipedia_test"
-        batch_size = 50
-        description = "Test run"
-    elif choice == '2':
-        max_articles = 10000
-        output_dir = "wikipedia_medium"
-        batch_size = 100
-        description = "Medium run"
-    elif choice == '3':
-        max_articles = 100000
-        output_dir = "wikipedia_large"
-        batch_size = 200
-        description = "Large run"
-    elif choice == '4':
-        max_articles = None
-        output_dir = "wikipedia_full"
-        batch_size = 500
-        description = "FULL processing"
-    else:
+    if choice not in RUN_OPTIONS:
         print("❌ Invalid choice")
         return
+    max_articles, output_dir, batch_size, description = RUN_OPTIONS[choice]
     
     print(f"\n🎯 Configuration:")
     print(f"   📄 Max articles: {max_articles or 'ALL'}")
@@ -72,7 +87,10 @@ def main():
     print(f"   📊 Description: {description}")
     
     # Confirm before starting
-    if choice in ['3', '4']:
+    if choice in ['3', '4'] and not args.assume_yes:
+        if not sys.stdin.isatty():
+            print("❌ Large run needs confirmation: pass --assume-yes")
+            return
         confirm = input(f"\n⚠️ This will process a large dataset. Continue? (y/n): ").lower().strip()
         if confirm != 'y':
             print("❌ Processing cancelled")
@@ -85,13 +103,15 @@ def main():
     try:
         from process_wikipedia import WikipediaProcessor
         
-        processor = WikipediaProcessor(output_dir=output_dir)
+        processor = WikipediaProcessor(output_dir=output_dir, quiet=args.quiet)
         start_time = time.time()
         
         processor.process_wikipedia_dump(
             dump_file=dump_file,
             max_articles=max_articles,
-            batch_size=batch_size
+            batch_size=batch_size,
+            workers=args.workers,
+            resume=args.resume
         )
         
         end_time = time.time()
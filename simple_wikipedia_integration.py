@@ -5,18 +5,124 @@ Add Wikipedia content to documents_metadata.json
 """
 
 import os
-import json
+import sys
+import argparse
+import mmap
+import shutil
+import orjson
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from itertools import chain
+from typing import List, Dict, Any, Optional, Tuple
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from arqa.document_store import shard_directory, iter_documents, backup_documents
+
+# Chunk metadata values that are identical across the chunks of one article
+SHARED_METADATA_KEYS = ('title', 'file_type', 'source_file', 'filename')
+
+class WikipediaDocument:
+    """A converted Wikipedia chunk; slots keep millions of them compact until they are written."""
+    __slots__ = ('position', 'content', 'wikipedia_metadata', 'added_date')
+    
+    def __init__(self, position: int, content: str, wikipedia_metadata: Dict[str, Any], added_date: str):
+        self.position = position
+        self.content = content
+        self.wikipedia_metadata = wikipedia_metadata
+        self.added_date = added_date
+    
+    @property
+    def id(self) -> str:
+        return f"doc_{self.position}"
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Document in the documents_metadata.json format."""
+        metadata = self.wikipedia_metadata
+        chunk_id = metadata.get('chunk_id', 0)
+        return {
+            "id": self.id,
+            "content": self.content,
+            "meta": {
+                "source": "wikipedia",
+                "title": metadata.get('title', 'Unknown'),
+                "wikipedia_metadata": metadata,
+                "added_date": self.added_date,
+                "chunk_id": chunk_id,
+                "total_chunks": metadata.get('total_chunks', 1)
+            },
+            "chunk_id": chunk_id
+        }
+
+def _document_default(obj):
+    """orjson hook: serialize WikipediaDocument objects as their dict form."""
+    if isinstance(obj, WikipediaDocument):
+        return obj.to_dict()
+    raise TypeError
+
+def _split_batch_file(batch_path: str, parts: int) -> List[Tuple[str, int, Optional[int]]]:
+    """Cut a batch file into (path, start, end) byte ranges that each hold whole lines"""
+    if not batch_path.endswith('.jsonl'):
+        return [(batch_path, 0, None)]
+    
+    size = os.path.getsize(batch_path)
+    offsets = [0]
+    with open(batch_path, 'rb') as f:
+        for k in range(1, parts):
+            f.seek(max(size * k // parts, offsets[-1]))
+            f.readline()  # move to the start of the next line
+            offsets.append(min(f.tell(), size))
+    offsets.append(size)
+    return [(batch_path, start, end) for start, end in zip(offsets, offsets[1:]) if end > start]
+
+def _load_batch_part(part: Tuple[str, int, Optional[int]]) -> List[Dict[str, Any]]:
+    """Decode one byte range of a batch file (runs in a worker process)"""
+    batch_path, start, end = part
+    with open(batch_path, 'rb') as f:
+        f.seek(start)
+        data = f.read() if end is None else f.read(end - start)
+    if batch_path.endswith('.jsonl'):
+        chunks = [orjson.loads(line) for line in data.splitlines() if line.strip()]
+    else:
+        chunks = orjson.loads(data)
+    
+    # Every chunk of an article repeats its title and source strings; interning
+    # makes them one shared object (pickle keeps that sharing on the way back)
+    for chunk in chunks:
+        metadata = chunk.get('metadata')
+        if metadata:
+            for key in SHARED_METADATA_KEYS:
+                value = metadata.get(key)
+                if isinstance(value, str):
+                    metadata[key] = sys.intern(value)
+    return chunks
+
+def parse_args():
+    """Command line options for headless runs"""
+    parser = argparse.ArgumentParser(description="Add processed Wikipedia chunks to documents_metadata.json")
+    parser.add_argument('-y', '--yes', '--assume-yes', dest='assume_yes', action='store_true',
+                        help="Do not ask for confirmation (or set ARQA_INTEGRATION_CONFIRM=y)")
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
+    assume_yes = args.assume_yes or os.environ.get('ARQA_INTEGRATION_CONFIRM') == 'y'
+    
     print("🚀 ARQA Wikipedia Integration")
     print("=" * 60)
     
     # Load existing metadata
     print("📁 Loading existing metadata...")
     try:
-        with open('documents_metadata.json', 'r', encoding='utf-8') as f:
-            existing_data = json.load(f)
+        # Parse straight from the page cache instead of reading a copy into memory
+        with open('documents_metadata.json', 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            existing_data = orjson.loads(view)
+        # Retriever-saved files keep their documents in Parquet shards
+        if 'documents_dir' in existing_data:
+            existing_data['documents'] = list(iter_documents('documents_metadata.json'))
+            del existing_data['documents_dir']
         existing_count = len(existing_data.get('documents', []))
         print(f"   ✅ Loaded {existing_count:,} existing documents")
     except Exception as e:
@@ -32,48 +138,47 @@ def main():
         print(f"❌ Directory not found: {data_dir}")
         return
     
-    batch_files = [f for f in os.listdir(data_dir) if f.startswith('wikipedia_batch_') and f.endswith('.json')]
-    batch_files.sort()
+    # scandir: one directory read with cached file types, and full paths without joining
+    with os.scandir(data_dir) as entries:
+        batch_files = sorted(
+            (entry.name, entry.path) for entry in entries
+            if entry.name.startswith('wikipedia_batch') and entry.name.endswith(('.json', '.jsonl')) and entry.is_file()
+        )
     
-    for batch_file in batch_files:
-        batch_path = os.path.join(data_dir, batch_file)
-        try:
-            with open(batch_path, 'r', encoding='utf-8') as f:
-                batch_data = json.load(f)
+    # Decode on all cores: JSONL files are split into line-aligned ranges, legacy
+    # JSON files are parsed whole; results are collected in file order
+    workers = os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = [
+            (batch_file, [executor.submit(_load_batch_part, part)
+                          for part in _split_batch_file(batch_path, workers)])
+            for batch_file, batch_path in batch_files
+        ]
+        
+        for batch_file, futures in pending:
+            try:
+                batch_data = list(chain.from_iterable(future.result() for future in futures))
                 all_chunks.extend(batch_data)
                 print(f"   ✅ Loaded {len(batch_data)} chunks from {batch_file}")
-        except Exception as e:
-            print(f"   ❌ Error loading {batch_file}: {e}")
+            except Exception as e:
+                print(f"   ❌ Error loading {batch_file}: {e}")
     
     print(f"📄 Total Wikipedia chunks loaded: {len(all_chunks)}")
     
     # Convert to metadata format
     print("🔄 Converting Wikipedia chunks to metadata format...")
-    new_documents = []
-    
-    for i, chunk in enumerate(all_chunks):
-        doc_id = existing_count + i
-        metadata = chunk.get('metadata', {})
-        title = metadata.get('title', 'Unknown')
-        
-        document = {
-            "id": f"doc_{doc_id}",
-            "content": chunk.get('content', ''),
-            "meta": {
-                "source": "wikipedia",
-                "title": title,
-                "wikipedia_metadata": metadata,
-                "added_date": datetime.now().isoformat(),
-                "chunk_id": metadata.get('chunk_id', 0),
-                "total_chunks": metadata.get('total_chunks', 1)
-            },
-            "chunk_id": metadata.get('chunk_id', 0)
-        }
-        
-        new_documents.append(document)
-        
-        if (i + 1) % 1000 == 0:
-            print(f"   📈 Converted {i + 1:,} chunks...")
+    # One timestamp for the whole import; the nested dict form is only built
+    # while each document is written out
+    added_date = datetime.now().isoformat()
+    new_documents = [
+        WikipediaDocument(
+            existing_count + i,
+            chunk.get('content', ''),
+            chunk.get('metadata', {}),
+            added_date
+        )
+        for i, chunk in enumerate(all_chunks)
+    ]
     
     print(f"✅ Conversion complete: {len(new_documents)} documents ready")
     
@@ -85,54 +190,89 @@ def main():
     print(f"   📄 Total after merge: {total_after:,}")
     
     # Confirm integration
-    confirm = input(f"\n✅ Proceed with integration? (y/n): ").lower().strip()
-    if confirm != 'y':
-        print("❌ Integration cancelled")
-        return
+    if not assume_yes:
+        if not sys.stdin.isatty():
+            print("❌ Integration needs confirmation: pass --yes or set ARQA_INTEGRATION_CONFIRM=y")
+            return
+        confirm = input(f"\n✅ Proceed with integration? (y/n): ").lower().strip()
+        if confirm != 'y':
+            print("❌ Integration cancelled")
+            return
     
     # Create backup
     backup_file = f"documents_metadata.json.backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
     try:
-        with open('documents_metadata.json', 'r', encoding='utf-8') as src:
-            with open(backup_file, 'w', encoding='utf-8') as dst:
-                dst.write(src.read())
+        # Shards move next to the backup, whose header is rewritten to point at them
+        backup_documents('documents_metadata.json', backup_file)
         print(f"💾 Backup created: {backup_file}")
     except Exception as e:
         print(f"⚠️ Backup failed: {e}")
     
     # Merge and save
     print("🔗 Merging and saving...")
-    merged_data = existing_data.copy()
-    merged_data['documents'].extend(new_documents)
+    # Stream existing + new documents one at a time into a temp file instead of
+    # building the merged list and one giant JSON string, then swap it in
+    tmp_file = 'documents_metadata.json.tmp'
+    total_count = 0
+    # Every new document is a Wikipedia chunk; only existing ones need checking
+    wikipedia_count = len(new_documents)
+    
+    # Existing IDs were validated when they were saved and new IDs are
+    # sequential, so only an existing ID that reuses a new one can clash
+    new_ids = {doc.id for doc in new_documents}
+    clashing_ids = 0
     
     try:
-        with open('documents_metadata.json', 'w', encoding='utf-8') as f:
-            json.dump(merged_data, f, ensure_ascii=False, indent=2)
+        with open(tmp_file, 'wb') as f:
+            f.write(b'{')
+            for key, value in existing_data.items():
+                if key != 'documents':
+                    f.write(orjson.dumps(key) + b': ' + orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS) + b', ')
+            f.write(b'"documents": [\n')
+            
+            for doc in chain(existing_data.get('documents', []), new_documents):
+                if total_count:
+                    f.write(b',\n')
+                f.write(orjson.dumps(doc, default=_document_default, option=orjson.OPT_NON_STR_KEYS))
+                
+                # Validation counters, gathered while writing
+                total_count += 1
+                if total_count <= existing_count:
+                    if doc['id'] in new_ids:
+                        clashing_ids += 1
+                    if doc.get('meta', {}).get('source') == 'wikipedia':
+                        wikipedia_count += 1
+            
+            f.write(b'\n]}\n')
+        
+        os.replace(tmp_file, 'documents_metadata.json')
         
-        print(f"✅ Successfully saved {len(merged_data['documents']):,} documents")
+        # The file now holds every document itself; drop shards a failed backup left behind
+        if os.path.isdir(shard_directory('documents_metadata.json')):
+            shutil.rmtree(shard_directory('documents_metadata.json'))
+        
+        print(f"✅ Successfully saved {total_count:,} documents")
         
         # Validation
         print("🔍 Validating integration...")
-        doc_ids = [doc['id'] for doc in merged_data['documents']]
-        unique_ids = set(doc_ids)
-        wikipedia_docs = [doc for doc in merged_data['documents'] if doc.get('meta', {}).get('source') == 'wikipedia']
-        
         print(f"📊 Validation Results:")
-        print(f"   📄 Total documents: {len(merged_data['documents']):,}")
-        print(f"   🆔 Unique IDs: {len(unique_ids):,}")
-        print(f"   📚 Wikipedia documents: {len(wikipedia_docs):,}")
-        print(f"   ✅ No ID duplicates: {len(unique_ids) == len(merged_data['documents'])}")
+        print(f"   📄 Total documents: {total_count:,}")
+        print(f"   🆔 Unique IDs: {total_count - clashing_ids:,}")
+        print(f"   📚 Wikipedia documents: {wikipedia_count:,}")
+        print(f"   ✅ No ID duplicates: {clashing_ids == 0}")
         
-        if len(unique_ids) == len(merged_data['documents']):
+        if clashing_ids == 0:
             print(f"\n🎉 Wikipedia Integration Complete!")
             print(f"✅ {len(new_documents):,} Wikipedia documents added successfully")
-            print(f"📄 Total dataset now contains {len(merged_data['documents']):,} documents")
+            print(f"📄 Total dataset now contains {total_count:,} documents")
             print(f"🚀 Ready for enhanced Arabic question answering!")
         else:
             print(f"\n❌ Integration completed but validation failed")
             
     except Exception as e:
         print(f"❌ Error saving metadata: {e}")
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
 
 if __name__ == "__main__":
     main()
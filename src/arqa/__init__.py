@@ -6,41 +6,37 @@ A comprehensive system for Arabic text processing, retrieval, and question answe
 __version__ = "0.1.0"
 __author__ = "ARQA Team"
 
-# ✅ Working imports (no complex dependencies)
-try:
-    from .simple_ingest import SimpleDocumentIngestor
-    __all__ = ['SimpleDocumentIngestor']
-except ImportError:
-    __all__ = []
-
-# 🔄 Advanced imports (require transformers, torch, faiss)
-try:
-    from .retriever import ArabicDocumentRetriever, RetrievedDocument
-    __all__.extend(['ArabicDocumentRetriever', 'RetrievedDocument'])
-except ImportError:
-    # Will be available when transformers, torch, faiss are installed
-    pass
-
-# 🔄 Advanced QA imports (require transformers + QA models)
-try:
-    from .reader_simple import SimpleArabicQA, create_arabic_qa_system
-    __all__.extend(['SimpleArabicQA', 'create_arabic_qa_system'])
-except ImportError:
-    # Will be available when transformers and QA models are installed
-    pass
-
-# 🔄 Future imports (require additional dependencies)
-# from .ingest import DocumentIngestor  # requires haystack
-# from .reader import QuestionAnswerer   # requires transformers + QA models
-try:
-    from .api import create_app
-    __all__.append('create_app')
-except ImportError:
-    pass
-
-__all__ = [
-    "DocumentIngestor",
-    "DocumentRetriever", 
-    "QuestionAnswerer",
-    "create_app"
-]
+import importlib
+
+# Submodules are imported on first attribute access, so importing one light
+# module (e.g. arqa.simple_ingest) does not pull in torch/transformers/FAISS.
+_LAZY_IMPORTS = {
+    # ✅ Working imports (no complex dependencies)
+    'SimpleDocumentIngestor': '.simple_ingest',
+    # 🔄 Advanced imports (require transformers, torch, faiss)
+    'OptimizedArabicRetriever': '.retriever_optimized_fixed',
+    'RetrievedDocument': '.retriever_optimized_fixed',
+    # 🔄 Advanced QA imports (require transformers + QA models)
+    'SimpleArabicQA': '.reader_simple',
+    'create_arabic_qa_system': '.reader_simple',
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+
+def __getattr__(name):
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    try:
+        module = importlib.import_module(module_name, __name__)
+        value = getattr(module, name)
+    except ImportError as e:
+        # Will be available when the optional dependencies are installed
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r} ({e})") from e
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
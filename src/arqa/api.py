@@ -10,8 +10,8 @@ Provides REST endpoints for:
 
 from fastapi import FastAPI, HTTPException, UploadFile, File, Form, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse
-from pydantic import BaseModel
+from fastapi.responses import HTMLResponse, JSONResponse, ORJSONResponse
+from pydantic import BaseModel, ConfigDict
 from typing import List, Optional, Dict, Any
 import uvicorn
 import asyncio
@@ -19,6 +19,10 @@ import os
 import sys
 import json
 import tempfile
+import hashlib
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # Add project root to path for imports
@@ -27,6 +31,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 from src.arqa.simple_ingest import SimpleDocumentIngestor
 from src.arqa.retriever_optimized_fixed import OptimizedArabicRetriever
 from src.arqa.reader_simple import SimpleArabicQA
+from src.arqa.uploads import read_upload_text, parse_upload, start_parse_pool, shutdown_parse_pool
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -34,7 +39,8 @@ app = FastAPI(
     description="Arabic Question Answering system with document processing and semantic search",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse  # orjson-encoded JSON bodies
 )
 
 # Add CORS middleware
@@ -54,32 +60,157 @@ class ARQASystem:
         self.qa_system = None
         self.initialized = False
         self.document_count = 0
+        # Retriever and QA calls run here, off the event loop. One thread: the
+        # FAISS index and document list are not safe to update and search concurrently
+        self.inference_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="arqa-inference")
+        # Parsed uploads keyed by BLAKE2b of filename + content, least recently used first
+        self.upload_cache = OrderedDict()
+        # (question, top_k) -> (expiry, retrieved docs); only touched on the inference thread
+        self.retrieval_cache = OrderedDict()
+        # Concurrent first requests wait here instead of each loading the models
+        self._init_lock = asyncio.Lock()
         
     async def initialize(self):
         """Initialize all ARQA components"""
         if self.initialized:
             return
+        
+        async with self._init_lock:
+            # Another request may have finished initializing while we waited
+            if self.initialized:
+                return
             
-        try:
-            print("🔧 Initializing ARQA System...")
-            
-            # Initialize components
-            self.ingestor = SimpleDocumentIngestor()
-            self.retriever = OptimizedArabicRetriever()
-            self.qa_system = SimpleArabicQA()
-            
-            self.initialized = True
-            print("✅ ARQA System initialized successfully!")
-            
-        except Exception as e:
-            print(f"❌ Failed to initialize ARQA System: {e}")
-            raise
+            try:
+                print("🔧 Initializing ARQA System...")
+                
+                # Load models on a worker thread so the event loop keeps serving requests
+                self.ingestor, self.retriever, self.qa_system = await asyncio.to_thread(
+                    lambda: (SimpleDocumentIngestor(), OptimizedArabicRetriever(), SimpleArabicQA())
+                )
+                
+                self.initialized = True
+                print("✅ ARQA System initialized successfully!")
+                
+            except Exception as e:
+                print(f"❌ Failed to initialize ARQA System: {e}")
+                raise
 
 # Global system instance
 arqa = ARQASystem()
 
+# Number of parsed uploads kept so re-uploading a file skips HTML/XML parsing
+UPLOAD_CACHE_SIZE = 32
+UPLOAD_READ_CHUNK = 1024 * 1024
+
+# Retrieval results reused for repeated questions (cleared whenever documents change)
+RETRIEVAL_CACHE_SIZE = 1024
+RETRIEVAL_CACHE_TTL = 300  # seconds
+
+# /ask micro-batching: concurrent questions are answered together, waiting at
+# most ASK_BATCH_WINDOW_MS for up to ASK_BATCH_MAX of them
+ASK_BATCH_MAX = 16
+ASK_BATCH_WINDOW_MS = 10
+ask_queue: Optional[asyncio.Queue] = None
+ask_worker: Optional[asyncio.Task] = None  # referenced so the task is not garbage collected
+
+async def _collect_ask_batch() -> List[tuple]:
+    """Wait for one question, then gather any that arrive within the batch window."""
+    batch = [await ask_queue.get()]
+    deadline = asyncio.get_running_loop().time() + ASK_BATCH_WINDOW_MS / 1000
+    
+    while len(batch) < ASK_BATCH_MAX:
+        remaining = deadline - asyncio.get_running_loop().time()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(ask_queue.get(), remaining))
+        except asyncio.TimeoutError:
+            break
+    return batch
+
+def _retrieve_cached(requests: List["QuestionRequest"]) -> List[list]:
+    """Retrieved documents per request, searching the index only for questions not cached."""
+    cache = arqa.retrieval_cache
+    now = time.monotonic()
+    keys = [(request.question, request.top_k) for request in requests]
+    
+    retrieved = {}
+    for key in keys:
+        entry = cache.get(key)
+        if entry is not None and entry[0] > now:
+            cache.move_to_end(key)
+            retrieved[key] = entry[1]
+    
+    missing = [key for key in dict.fromkeys(keys) if key not in retrieved]
+    if missing:
+        # One encoder pass and one index search for every uncached question
+        top_k = max(k for _, k in missing)
+        results = arqa.retriever.retrieve_batch([question for question, _ in missing], top_k=top_k)
+        for key, docs in zip(missing, results):
+            retrieved[key] = docs[:key[1]]
+            cache[key] = (now + RETRIEVAL_CACHE_TTL, retrieved[key])
+        while len(cache) > RETRIEVAL_CACHE_SIZE:
+            cache.popitem(last=False)
+    
+    return [retrieved[key] for key in keys]
+
+def _add_documents(documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Index uploaded chunks and drop retrieval results that no longer reflect the index."""
+    result = arqa.retriever.add_documents_incremental(documents, background=False)
+    arqa.retrieval_cache.clear()
+    return result
+
+def _clear_documents() -> None:
+    """Swap in an empty retriever and drop retrieval results from the old index."""
+    retriever = OptimizedArabicRetriever()
+    # A fresh retriever reloads the saved index; start from nothing instead
+    retriever.index = None
+    retriever.documents = []
+    retriever.id_to_doc = {}
+    retriever.document_hashes = set()
+    arqa.retriever = retriever
+    arqa.retrieval_cache.clear()
+
+def _answer_batch(requests: List["QuestionRequest"]) -> List[tuple]:
+    """Retrieve and answer a batch of questions; returns (answers, retrieved count) per request."""
+    questions = [request.question for request in requests]
+    top_k = max(request.top_k for request in requests)
+    
+    retrieved = _retrieve_cached(requests)
+    
+    # One batched QA pipeline call for every (question, document) pair
+    answers = arqa.qa_system.answer_batch(
+        questions,
+        retrieved,  # RetrievedDocument objects are read directly, no per-document dicts
+        top_k=top_k
+    )
+    return [(question_answers[:request.top_k], len(docs))
+            for question_answers, docs, request in zip(answers, retrieved, requests)]
+
+async def _ask_batch_worker():
+    """Answer queued /ask requests in micro-batches."""
+    while True:
+        batch = await _collect_ask_batch()
+        requests = [request for request, _ in batch]
+        
+        try:
+            # Model calls block, so run them off the event loop
+            results = await asyncio.get_running_loop().run_in_executor(
+                arqa.inference_executor, _answer_batch, requests
+            )
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
 # Pydantic models for API
 class QuestionRequest(BaseModel):
+    # Immutable and closed: pydantic-core validates it without dynamic-attribute handling
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
     question: str
     top_k: int = 3
     min_confidence: float = 0.01
@@ -108,12 +239,20 @@ class SystemStatus(BaseModel):
 @app.on_event("startup")
 async def startup_event():
     """Initialize ARQA system on startup"""
+    global ask_queue, ask_worker
     await arqa.initialize()
+    start_parse_pool()
+    
+    ask_queue = asyncio.Queue()
+    ask_worker = asyncio.create_task(_ask_batch_worker())
 
-@app.get("/", response_class=HTMLResponse)
-async def root():
-    """Root endpoint with basic interface"""
-    html_content = """
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the upload parse pool's worker processes"""
+    await asyncio.to_thread(shutdown_parse_pool)
+
+# Root page, encoded once at import and served as the same response every time
+ROOT_HTML = """
     <!DOCTYPE html>
     <html>
     <head>
@@ -161,8 +300,13 @@ async def root():
         </div>
     </body>
     </html>
-    """
-    return html_content
+    """.encode('utf-8')
+ROOT_RESPONSE = HTMLResponse(content=ROOT_HTML)
+
+@app.get("/", response_class=HTMLResponse)
+async def root():
+    """Root endpoint with basic interface"""
+    return ROOT_RESPONSE
 
 @app.get("/status", response_model=SystemStatus)
 async def get_status():
@@ -191,28 +335,43 @@ async def upload_document(file: UploadFile = File(...)):
     if not arqa.initialized:
         await arqa.initialize()
     
-    start_time = datetime.now()
+    start_time = time.perf_counter_ns()
     
     try:
         # Validate file type - now supports both HTML and XML
         if not file.filename.endswith(('.html', '.htm', '.xml')):
             raise HTTPException(status_code=400, detail="Only HTML and XML files are supported")
         
-        # Read file content
-        content = await file.read()
-        file_content = content.decode('utf-8')
+        # Hash the upload in chunks straight from Starlette's spooled temp file
+        # (small uploads stay in RAM, large ones on disk) instead of one big read.
+        # Filename is part of the key: it selects the parser and is stored in chunk metadata
+        digest = hashlib.blake2b(file.filename.encode('utf-8') + b'\0')
+        while chunk := await file.read(UPLOAD_READ_CHUNK):
+            digest.update(chunk)
+        cache_key = digest.digest()
+        documents = arqa.upload_cache.get(cache_key)
         
-        # Process with ingestor based on file type
-        if file.filename.endswith('.xml'):
-            documents = arqa.ingestor.process_xml_content(file_content, source_url=file.filename)
+        if documents is not None:
+            arqa.upload_cache.move_to_end(cache_key)
         else:
-            documents = arqa.ingestor.process_html_content(file_content, source_url=file.filename)
+            # Decode straight from the spooled file; no intermediate bytes copy
+            await file.seek(0)
+            file_content = await asyncio.to_thread(read_upload_text, file.file)
+            
+            # Process with ingestor based on file type
+            documents = await parse_upload(arqa.ingestor, file.filename, file_content)
+            
+            arqa.upload_cache[cache_key] = documents
+            if len(arqa.upload_cache) > UPLOAD_CACHE_SIZE:
+                arqa.upload_cache.popitem(last=False)
         
-        # Add to retriever
-        arqa.retriever.add_documents(documents)
-        arqa.document_count += len(documents)
+        # Add to retriever (embedded and indexed before responding)
+        result = await asyncio.get_running_loop().run_in_executor(
+            arqa.inference_executor, _add_documents, documents
+        )
+        arqa.document_count = result['total_documents']
         
-        processing_time = (datetime.now() - start_time).total_seconds()
+        processing_time = (time.perf_counter_ns() - start_time) / 1e9
         
         return DocumentUploadResponse(
             filename=file.filename,
@@ -233,36 +392,13 @@ async def ask_question(request: QuestionRequest):
     if arqa.document_count == 0:
         raise HTTPException(status_code=400, detail="No documents uploaded yet. Please upload documents first.")
     
-    start_time = datetime.now()
+    start_time = time.perf_counter_ns()
     
     try:
-        # Retrieve relevant documents
-        retrieved_docs = arqa.retriever.retrieve(request.question, top_k=request.top_k)
-        
-        if not retrieved_docs:
-            return QuestionResponse(
-                question=request.question,
-                answers=[],
-                processing_time=(datetime.now() - start_time).total_seconds(),
-                retrieved_docs=0
-            )
-        
-        # Convert to QA format
-        docs_for_qa = []
-        for doc in retrieved_docs:
-            docs_for_qa.append({
-                'content': doc.content,
-                'metadata': doc.meta,
-                'score': doc.score,
-                'id': doc.doc_id
-            })
-        
-        # Get answers
-        answers = arqa.qa_system.answer_with_retrieved_docs(
-            request.question, 
-            docs_for_qa, 
-            top_k=request.top_k
-        )
+        # Queue the question for the micro-batch worker and wait for its answers
+        future = asyncio.get_running_loop().create_future()
+        ask_queue.put_nowait((request, future))
+        answers, retrieved_count = await future
         
         # Filter by confidence
         filtered_answers = [
@@ -270,13 +406,13 @@ async def ask_question(request: QuestionRequest):
             if answer.get('confidence', 0) >= request.min_confidence
         ]
         
-        processing_time = (datetime.now() - start_time).total_seconds()
+        processing_time = (time.perf_counter_ns() - start_time) / 1e9
         
         return QuestionResponse(
             question=request.question,
             answers=filtered_answers,
             processing_time=processing_time,
-            retrieved_docs=len(retrieved_docs)
+            retrieved_docs=retrieved_count
         )
         
     except Exception as e:
@@ -300,8 +436,8 @@ async def clear_documents():
         await arqa.initialize()
     
     try:
-        # Reinitialize retriever to clear documents
-        arqa.retriever = ArabicDocumentRetriever()
+        # Reinitialize retriever to clear documents (on the inference thread, like every index update)
+        await asyncio.get_running_loop().run_in_executor(arqa.inference_executor, _clear_documents)
         arqa.document_count = 0
         
         return {"message": "All documents cleared successfully", "document_count": 0}
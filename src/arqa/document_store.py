@@ -0,0 +1,165 @@
+"""
+Sharded Document Storage for ARQA
+Documents live in Parquet shards of SHARD_SIZE rows next to a small JSON header,
+so saving appends shards instead of rewriting one huge JSON file.
+"""
+
+import os
+import glob
+import math
+import shutil
+from typing import List, Dict, Any, Iterator
+
+import ijson
+import orjson
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+SHARD_SIZE = 10000
+
+# 'meta' is stored as a JSON string: its keys differ between document sources
+SCHEMA = pa.schema([
+    ('id', pa.string()),
+    ('content', pa.string()),
+    ('meta', pa.string()),
+    ('chunk_id', pa.int64()),
+    ('hash', pa.string()),
+])
+
+
+def shard_directory(documents_path: str) -> str:
+    """Shard directory for a metadata file: documents_metadata.json -> documents_metadata/"""
+    return os.path.splitext(documents_path)[0]
+
+
+def _shard_files(directory: str) -> List[str]:
+    # Zero-padded names: lexical order is document order (= FAISS id order)
+    return sorted(glob.glob(os.path.join(directory, "part-*.parquet")))
+
+
+def documents_directory(documents_path: str) -> str:
+    """
+    Shard directory named by the header's 'documents_dir' (relative to the header),
+    falling back to shard_directory(documents_path).
+
+    Only the header fields before a legacy 'documents' list are scanned.
+    """
+    if os.path.exists(documents_path):
+        with open(documents_path, 'rb') as f:
+            for prefix, event, value in ijson.parse(f):
+                if prefix == '' and event == 'map_key' and value == 'documents':
+                    break
+                if prefix == 'documents_dir' and event == 'string':
+                    return os.path.join(os.path.dirname(documents_path), value)
+    return shard_directory(documents_path)
+
+
+def has_document_shards(documents_path: str) -> bool:
+    """Whether documents for this metadata file are stored as Parquet shards."""
+    return bool(_shard_files(documents_directory(documents_path)))
+
+
+def write_document_shards(documents: List[Dict[str, Any]], directory: str, start: int = 0) -> None:
+    """
+    Write documents as Parquet shards, starting with the shard that holds `start`.
+
+    Shards before that are assumed unchanged; shards past the end are removed.
+    """
+    os.makedirs(directory, exist_ok=True)
+    num_shards = math.ceil(len(documents) / SHARD_SIZE)
+
+    for shard in range(start // SHARD_SIZE, num_shards):
+        rows = documents[shard * SHARD_SIZE:(shard + 1) * SHARD_SIZE]
+        table = pa.table({
+            'id': [doc['id'] for doc in rows],
+            'content': [doc['content'] for doc in rows],
+            'meta': [orjson.dumps(doc.get('meta', {}), option=orjson.OPT_SERIALIZE_NUMPY).decode('utf-8') for doc in rows],
+            'chunk_id': [doc.get('chunk_id', 0) for doc in rows],
+            'hash': [doc.get('hash') for doc in rows],
+        }, schema=SCHEMA)
+
+        # Write then rename so a crash never leaves a half-written shard
+        path = os.path.join(directory, f"part-{shard:05d}.parquet")
+        pq.write_table(table, f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+
+    for path in _shard_files(directory)[num_shards:]:
+        os.remove(path)
+
+
+def iter_documents(documents_path: str, batch_size: int = 4096) -> Iterator[Dict[str, Any]]:
+    """
+    Stream documents in order from Parquet shards, or from a legacy
+    documents_metadata.json that still holds a 'documents' list.
+    """
+    shard_files = _shard_files(documents_directory(documents_path))
+
+    if not shard_files:
+        with open(documents_path, 'rb') as f:
+            yield from ijson.items(f, 'documents.item', use_float=True)
+        return
+
+    for path in shard_files:
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            for doc in batch.to_pylist():
+                doc['meta'] = orjson.loads(doc['meta'])
+                if doc['hash'] is None:
+                    del doc['hash']
+                yield doc
+
+
+def read_header_value(documents_path: str, key: str, default: Any = None) -> Any:
+    """
+    A top-level field of the metadata file (e.g. 'model_name'), streamed so a
+    legacy file's 'documents' list is never loaded into memory.
+    """
+    with open(documents_path, 'rb') as f:
+        return next(ijson.items(f, key, use_float=True), default)
+
+
+def count_documents(documents_path: str) -> int:
+    """Number of stored documents, read from Parquet footers when sharded."""
+    shard_files = _shard_files(documents_directory(documents_path))
+    if shard_files:
+        return sum(pq.ParquetFile(path).metadata.num_rows for path in shard_files)
+    return sum(1 for _ in iter_documents(documents_path))
+
+
+def move_documents(src_path: str, dst_path: str) -> None:
+    """Replace the header and shards at dst_path with the ones at src_path (e.g. after a rebuild)."""
+    src_dir, dst_dir = documents_directory(src_path), shard_directory(dst_path)
+    if os.path.isdir(dst_dir):
+        shutil.rmtree(dst_dir)
+    os.replace(src_dir, dst_dir)
+
+    with open(src_path, 'rb') as f:
+        header = orjson.loads(f.read())
+    header['documents_dir'] = os.path.basename(dst_dir)
+    with open(dst_path, 'wb') as f:
+        f.write(orjson.dumps(header, option=orjson.OPT_INDENT_2))
+    os.remove(src_path)
+
+
+def backup_documents(documents_path: str, backup_path: str) -> None:
+    """
+    Keep the documents at documents_path readable from backup_path before they are replaced.
+
+    Shards are moved to f"{backup_path}_documents" and the backup header points at
+    them; a legacy single-file store is hardlinked (or copied) instead, which is safe
+    as long as the replacement is swapped in with os.replace.
+    """
+    stored_dir = documents_directory(documents_path)
+    if not _shard_files(stored_dir):
+        try:
+            os.link(documents_path, backup_path)
+        except OSError:
+            shutil.copyfile(documents_path, backup_path)
+        return
+
+    with open(documents_path, 'rb') as f:
+        header = orjson.loads(f.read())
+    backup_dir = f"{backup_path}_documents"
+    header['documents_dir'] = os.path.basename(backup_dir)
+    with open(backup_path, 'wb') as f:
+        f.write(orjson.dumps(header, option=orjson.OPT_INDENT_2))
+    os.replace(stored_dir, backup_dir)
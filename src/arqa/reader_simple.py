@@ -5,6 +5,7 @@ Handles Arabic question answering using transformers without Haystack dependency
 
 from typing import List, Dict, Any, Optional, Tuple
 import re
+from functools import lru_cache
 import torch
 from transformers import pipeline
 from tqdm import tqdm
@@ -14,6 +15,17 @@ import warnings
 warnings.filterwarnings("ignore", category=UserWarning)
 
 
+@lru_cache(maxsize=None)
+def load_qa_pipeline(model_name: str, max_answer_len: int):
+    """Create a QA pipeline once per process so SimpleArabicQA instances share the model."""
+    return pipeline(
+        "question-answering",
+        model=model_name,
+        device=0 if torch.cuda.is_available() else -1,
+        max_answer_len=max_answer_len
+    )
+
+
 class SimpleArabicQA:
     """
     Simple Arabic Question Answering system using transformer models.
@@ -42,12 +54,7 @@ class SimpleArabicQA:
         
         try:
             # Create QA pipeline directly (handles model and tokenizer loading)
-            self.qa_pipeline = pipeline(
-                "question-answering",
-                model=model_name,
-                device=0 if torch.cuda.is_available() else -1,
-                max_answer_len=max_answer_len
-            )
+            self.qa_pipeline = load_qa_pipeline(model_name, max_answer_len)
             
             print(f"✅ Model loaded successfully!")
             print(f"   Device: {'GPU' if torch.cuda.is_available() else 'CPU'}")
@@ -60,12 +67,7 @@ class SimpleArabicQA:
             # Fallback to a smaller multilingual model
             try:
                 self.model_name = "distilbert-base-cased-distilled-squad"
-                self.qa_pipeline = pipeline(
-                    "question-answering",
-                    model=self.model_name,
-                    device=0 if torch.cuda.is_available() else -1,
-                    max_answer_len=max_answer_len
-                )
+                self.qa_pipeline = load_qa_pipeline(self.model_name, max_answer_len)
                 print(f"✅ Fallback model loaded: {self.model_name}")
                 
             except Exception as fallback_error:
@@ -150,59 +152,120 @@ class SimpleArabicQA:
         
         Args:
             question: Question in Arabic
-            retrieved_docs: Documents from retriever
+            retrieved_docs: Documents from retriever (QA dicts or RetrievedDocument objects)
             top_k: Number of answers to return
             combine_scores: Whether to combine retrieval and QA scores
             
         Returns:
             List of answers with document information
         """
-        all_answers = []
-        
         print(f"🔍 Processing {len(retrieved_docs)} retrieved documents...")
         
-        for i, doc in enumerate(tqdm(retrieved_docs, desc="Answering")):
-            doc_content = doc.get('content', '')
-            doc_meta = doc.get('metadata', {})
-            retrieval_score = doc.get('score', 0.0)
+        return self.answer_batch([question], [retrieved_docs], top_k=top_k, combine_scores=combine_scores)[0]
+    
+    def answer_batch(self, 
+                     questions: List[str], 
+                     retrieved_docs: List[List[Dict[str, Any]]],
+                     top_k: int = 3,
+                     combine_scores: bool = True,
+                     batch_size: int = 16) -> List[List[Dict[str, Any]]]:
+        """
+        Answer several questions, each over its own retrieved documents.
+        
+        Every (question, document) pair goes through the QA pipeline in one
+        batched call instead of one forward pass per pair.
+        
+        Args:
+            questions: Questions in Arabic
+            retrieved_docs: Retrieved documents for each question, as QA dicts
+                ('content', 'metadata', 'score', 'id') or RetrievedDocument objects
+            top_k: Number of answers to return per question
+            combine_scores: Whether to combine retrieval and QA scores
+            batch_size: Pairs per model forward pass
             
-            if not doc_content.strip():
+        Returns:
+            List of answer lists, one per question
+        """
+        # One column per document field, read once per (question, document) pair
+        pair_question_indices = []
+        pair_questions = []
+        pair_contexts = []
+        pair_metas = []
+        pair_scores = []
+        pair_ids = []
+        
+        for question_index, (question, docs) in enumerate(zip(questions, retrieved_docs)):
+            normalized_question = self.normalize_arabic_text(question)
+            if not normalized_question:
+                continue
+            for doc_index, doc in enumerate(docs):
+                content, meta, score, doc_id = self._document_fields(doc, doc_index)
+                # Keep original context to preserve non-normalized answers
+                if content.strip():
+                    pair_question_indices.append(question_index)
+                    pair_questions.append(normalized_question)
+                    pair_contexts.append(content)
+                    pair_metas.append(meta)
+                    pair_scores.append(score)
+                    pair_ids.append(doc_id)
+        
+        results = []
+        if pair_questions:
+            try:
+                results = self.qa_pipeline(question=pair_questions, context=pair_contexts, batch_size=batch_size)
+                # A single pair comes back as a dict rather than a list
+                if isinstance(results, dict):
+                    results = [results]
+            except Exception as e:
+                print(f"❌ Error in question answering: {e}")
+        
+        all_answers = [[] for _ in questions]
+        
+        for question_index, doc_content, doc_meta, retrieval_score, doc_id, answer in zip(
+                pair_question_indices, pair_contexts, pair_metas, pair_scores, pair_ids, results):
+            if answer.get('score', 0) < 0.01:
                 continue
-              # Get answers from this document
-            answers = self.answer_question(question, doc_content, top_k=2, min_score=0.01)
             
             # Add document information to answers
-            for answer in answers:
-                enhanced_answer = {
-                    'answer': answer['answer'],
-                    'confidence': answer['score'],
-                    'retrieval_score': retrieval_score,
-                    'document_id': doc.get('id', f'doc_{i}'),
-                    'document_title': doc_meta.get('title', 'Unknown'),
-                    'document_url': doc_meta.get('url', ''),
-                    'answer_start': answer.get('start', 0),
-                    'answer_end': answer.get('end', 0),
-                    'context_snippet': self._get_context_snippet(
-                        doc_content, 
-                        answer.get('start', 0), 
-                        answer.get('end', 0)
-                    )
-                }
-                
-                # Combine scores if requested
-                if combine_scores:
-                    enhanced_answer['combined_score'] = (
-                        answer['score'] * 0.7 + retrieval_score * 0.3
-                    )
-                else:
-                    enhanced_answer['combined_score'] = answer['score']
-                
-                all_answers.append(enhanced_answer)
+            enhanced_answer = {
+                'answer': answer['answer'],
+                'confidence': answer['score'],
+                'retrieval_score': retrieval_score,
+                'document_id': doc_id,
+                'document_title': doc_meta.get('title', 'Unknown'),
+                'document_url': doc_meta.get('url', ''),
+                'answer_start': answer.get('start', 0),
+                'answer_end': answer.get('end', 0),
+                'context_snippet': self._get_context_snippet(
+                    doc_content, 
+                    answer.get('start', 0), 
+                    answer.get('end', 0)
+                )
+            }
+            
+            # Combine scores if requested
+            if combine_scores:
+                enhanced_answer['combined_score'] = (
+                    answer['score'] * 0.7 + retrieval_score * 0.3
+                )
+            else:
+                enhanced_answer['combined_score'] = answer['score']
+            
+            all_answers[question_index].append(enhanced_answer)
         
         # Sort by combined score
-        all_answers.sort(key=lambda x: x['combined_score'], reverse=True)
+        for answers in all_answers:
+            answers.sort(key=lambda x: x['combined_score'], reverse=True)
         
-        return all_answers[:top_k]
+        return [answers[:top_k] for answers in all_answers]
+    
+    @staticmethod
+    def _document_fields(doc, doc_index: int) -> tuple:
+        """(content, metadata, retrieval score, id) of a QA dict or a RetrievedDocument."""
+        if isinstance(doc, dict):
+            return (doc.get('content', ''), doc.get('metadata', {}),
+                    doc.get('score', 0.0), doc.get('id', f'doc_{doc_index}'))
+        return doc.content, doc.meta, doc.score, doc.doc_id
     
     def _get_context_snippet(self, text: str, start: int, end: int, 
                            snippet_length: int = 200) -> str:
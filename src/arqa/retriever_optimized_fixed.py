@@ -4,7 +4,6 @@ High-performance retriever with incremental indexing and background processing.
 """
 
 import os
-import json
 import pickle
 import asyncio
 import numpy as np
@@ -14,12 +13,43 @@ from tqdm import tqdm
 import torch
 from transformers import AutoTokenizer, AutoModel
 import faiss
+import orjson
 import re
+import math
 import hashlib
+import sqlite3
+from collections import OrderedDict
+from functools import lru_cache
 from concurrent.futures import ThreadPoolExecutor
 import threading
 import time
 
+from .document_store import shard_directory, write_document_shards, iter_documents
+
+# Let the CUDA caching allocator grow segments in place instead of
+# cudaMalloc-ing new blocks as batch shapes vary. It is read at the first CUDA
+# allocation, not at import, so setting it here is early enough; an explicit
+# setting in the environment wins. Older torch rejects the unknown option
+if tuple(int(part) for part in torch.__version__.split('.')[:2]) >= (2, 1):
+    os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True")
+
+# Progress bars: ARQA_QUIET=1 turns them off, and they are skipped when stdout is
+# not a terminal (disable=None) so redirected logs don't fill with redraws
+PROGRESS_DISABLE = True if os.environ.get('ARQA_QUIET') == '1' else None
+PROGRESS_MININTERVAL = 1.0
+
+# Below this corpus size an exhaustive index is small and fast enough
+IVFPQ_MIN_DOCUMENTS = 50000
+
+# Background indexing embeds up to this many encoder batches per pass, first
+# waiting INDEXING_WAIT seconds so chunks from concurrent uploads share batches
+INDEXING_BATCHES_PER_PASS = 4
+INDEXING_WAIT = 0.02
+
+# New documents are embedded in groups of this size; each group's FAISS insert
+# runs on a helper thread while the next group is being embedded
+INDEX_ADD_GROUP_SIZE = 2048
+
 
 @dataclass
 class RetrievedDocument:
@@ -29,6 +59,131 @@ class RetrievedDocument:
     score: float
     doc_id: str
     chunk_id: int = 0
+    
+    def to_qa_dict(self) -> Dict[str, Any]:
+        """Dict format for SimpleArabicQA (which also accepts the RetrievedDocument itself)."""
+        return {'content': self.content, 'metadata': self.meta, 'score': self.score, 'id': self.doc_id}
+
+
+def choose_index_factory(num_documents: int, pq_subquantizers: int = 64) -> str:
+    """Pick a FAISS index_factory string (inner product on L2-normalized vectors) for the corpus size."""
+    if num_documents < IVFPQ_MIN_DOCUMENTS:
+        # Exhaustive search over float16 vectors: half the memory of IndexFlatIP
+        return "SQfp16"
+    # ~4*sqrt(N) inverted lists, capped at 4096; 8-bit PQ codes (64 bytes/vector by default)
+    nlist = min(4096, int(4 * math.sqrt(num_documents)))
+    return f"IVF{nlist},PQ{pq_subquantizers}"
+
+
+@lru_cache(maxsize=None)
+def load_encoder(model_name: str, device: str, lru_embeddings_path: Optional[str] = None):
+    """
+    Load (tokenizer, model) once per process so every retriever instance shares the weights.
+
+    With lru_embeddings_path the word embeddings are served from that file through an
+    LRUEmbeddingProxy; that model is cached separately, so plain retrievers never see it.
+    """
+    # Rust-backed tokenizer; falls back to the Python one when a model has no fast version
+    tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+    if not tokenizer.is_fast:
+        print(f"⚠️ No fast tokenizer for {model_name}; tokenization will be slower")
+    model = AutoModel.from_pretrained(model_name)
+    
+    # Move to device and optimize
+    if device == "cuda":
+        model = model.cuda()
+        # Enable mixed precision for faster inference
+        model = model.half()
+    
+    # Swap the word embedding matrix for a disk-backed LRU of rows
+    if lru_embeddings_path:
+        model.set_input_embeddings(LRUEmbeddingProxy(model.get_input_embeddings(), lru_embeddings_path))
+        print(f"🧠 Word embeddings served from disk with an LRU of {model.get_input_embeddings().capacity:,} rows")
+    
+    model.eval()
+    return tokenizer, model
+
+
+class LRUEmbeddingProxy(torch.nn.Module):
+    """
+    Drop-in replacement for an nn.Embedding that keeps only recently used rows in memory.
+
+    The full table is written once to a float16 file and memory-mapped; rows are
+    copied into an LRU cache (default capacity: 10% of the vocabulary) on first use.
+    """
+
+    def __init__(self, embedding: torch.nn.Embedding, path: str, capacity: Optional[int] = None):
+        super().__init__()
+        self.num_embeddings, self.embedding_dim = embedding.weight.shape
+        self.capacity = capacity or max(1, self.num_embeddings // 10)
+        self.dtype = embedding.weight.dtype
+        self.device = embedding.weight.device
+
+        # (Re)write the row file if it is missing or belongs to another model
+        expected_size = self.num_embeddings * self.embedding_dim * 2
+        if not os.path.exists(path) or os.path.getsize(path) != expected_size:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            embedding.weight.detach().to(torch.float16).cpu().numpy().tofile(path)
+
+        self.rows = np.memmap(path, dtype=np.float16, mode='r',
+                              shape=(self.num_embeddings, self.embedding_dim))
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def forward(self, input_ids: torch.Tensor) -> torch.Tensor:
+        unique_ids, inverse = torch.unique(input_ids, return_inverse=True)
+
+        rows = []
+        with self.lock:
+            for token_id in unique_ids.tolist():
+                row = self.cache.get(token_id)
+                if row is None:
+                    row = torch.from_numpy(np.array(self.rows[token_id])).to(device=self.device, dtype=self.dtype)
+                    self.cache[token_id] = row
+                else:
+                    self.cache.move_to_end(token_id)
+                rows.append(row)
+
+            # Evict least recently used rows
+            while len(self.cache) > self.capacity:
+                self.cache.popitem(last=False)
+
+        return torch.stack(rows)[inverse]
+
+
+class EmbeddingCache:
+    """
+    Embeddings persisted in SQLite, keyed by hex digest.
+
+    WAL mode lets several server processes read and write the same file
+    concurrently; callers in one process serialize access with a lock.
+    """
+
+    # Stay under SQLite's bound-parameter limit on older builds
+    MAX_KEYS_PER_QUERY = 500
+
+    def __init__(self, path: str):
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self.connection.commit()
+
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """Stored vectors for the keys that are present."""
+        found = {}
+        for start in range(0, len(keys), self.MAX_KEYS_PER_QUERY):
+            chunk = keys[start:start + self.MAX_KEYS_PER_QUERY]
+            placeholders = ','.join('?' * len(chunk))
+            found.update(self.connection.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+            ))
+        return found
+
+    def put_many(self, items: List[tuple]) -> None:
+        """Store (key, vector bytes) pairs in one transaction; existing keys are kept."""
+        with self.connection:
+            self.connection.executemany("INSERT OR IGNORE INTO embeddings (key, vector) VALUES (?, ?)", items)
 
 
 class OptimizedArabicRetriever:
@@ -48,7 +203,14 @@ class OptimizedArabicRetriever:
                  top_k: int = 10,
                  device: str = "auto",
                  batch_size: int = 32,
-                 use_fast_model: bool = False):
+                 use_fast_model: bool = False,
+                 query_cache_size: int = 10000,
+                 index_factory: Optional[str] = None,
+                 nprobe: int = 32,
+                 train_sample_size: int = 50000,
+                 fast_query: bool = False,
+                 lru_embeddings: bool = False,
+                 embedding_cache_path: Optional[str] = None):
         """
         Initialize optimized retriever.
         
@@ -60,12 +222,32 @@ class OptimizedArabicRetriever:
             device: Device to run model on ('auto', 'cpu', 'cuda')
             batch_size: Batch size for embedding processing
             use_fast_model: Whether to use a faster but less accurate model
+            query_cache_size: Maximum number of query embeddings kept in the LRU cache
+            index_factory: FAISS index_factory string (e.g. "SQfp16", "IVF4096,PQ32")
+                for new indexes, always built with METRIC_INNER_PRODUCT over
+                L2-normalized embeddings; None keeps an exact IndexFlatIP. Trainable indexes are
+                trained on the first batch of embeddings added, so that batch
+                must be large enough for the chosen configuration.
+            nprobe: Number of inverted lists probed per query for IVF indexes
+            train_sample_size: Maximum number of embeddings used for training
+            fast_query: Embed queries as the mean of precomputed per-token
+                embeddings instead of running the encoder on every query
+            lru_embeddings: Keep only recently used rows of the encoder's word
+                embedding table in memory and read the rest from disk
+            embedding_cache_path: Optional SQLite file that keeps passage and query
+                embeddings across runs, keyed by model name and normalized text;
+                safe to share between processes
         """
         self.model_name = model_name
         self.index_path = index_path
         self.documents_path = documents_path
         self.top_k = top_k
         self.batch_size = batch_size
+        self.index_factory = index_factory
+        self.nprobe = nprobe
+        self.train_sample_size = train_sample_size
+        self.fast_query = fast_query
+        self.query_table_path = f"{index_path}_query_table.npy"
         
         # Use faster model if requested
         if use_fast_model:
@@ -90,30 +272,36 @@ class OptimizedArabicRetriever:
         
         print(f"🔧 Initializing Optimized Retriever with {self.model_name} on {self.device}")
         
-        # Initialize model and tokenizer
-        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-        self.model = AutoModel.from_pretrained(self.model_name)
-        
-        # Move to device and optimize
-        if self.device == "cuda":
-            self.model = self.model.cuda()
-            # Enable mixed precision for faster inference
-            self.model = self.model.half()
-        
-        self.model.eval()
+        # Initialize model and tokenizer (shared with other retrievers in this process)
+        self.tokenizer, self.model = load_encoder(
+            self.model_name, self.device,
+            f"{index_path}_embeddings.f16.bin" if lru_embeddings else None
+        )
         
         # Initialize storage
         self.index = None
         self.documents = []
         self.id_to_doc = {}
         self.document_hashes = set()  # Track document hashes for deduplication
+        self._saved_documents = (None, None, 0)  # (shard dir, documents list, count) of the last save
         self.embeddings_cache = {}    # Cache embeddings by document hash
+        self.query_cache = OrderedDict()  # LRU cache of normalized query -> embedding
+        self.query_cache_size = query_cache_size
+        
+        # Persistent embedding cache shared across runs
+        self.embedding_cache = EmbeddingCache(embedding_cache_path) if embedding_cache_path else None
+        self.embedding_cache_lock = threading.Lock()
         
         # Background processing
         self.indexing_queue = []
         self.indexing_in_progress = False
         self.indexing_lock = threading.Lock()
         
+        # Token embedding table for fast query encoding
+        self.query_table = None
+        if self.fast_query:
+            self.load_query_embedding_table()
+        
         # Load existing index if available
         self.load_index()
         
@@ -121,11 +309,12 @@ class OptimizedArabicRetriever:
     
     def _get_document_hash(self, content: str, meta: Optional[Dict[str, Any]] = None) -> str:
         """Generate hash for document deduplication including metadata."""
-        # Include both content and source URL in hash to allow same content from different sources
-        hash_content = content
+        # Include both content and source URL in hash to allow same content from different sources.
+        # Fed to MD5 piecewise (same digest as hashing the joined string) to skip copying the chunk
+        digest = hashlib.md5(content.encode('utf-8'))
         if meta and 'source_url' in meta:
-            hash_content = f"{content}||SOURCE:{meta['source_url']}"
-        return hashlib.md5(hash_content.encode('utf-8')).hexdigest()
+            digest.update(f"||SOURCE:{meta['source_url']}".encode('utf-8'))
+        return digest.hexdigest()
     
     def normalize_arabic_text(self, text: str) -> str:
         """Optimized Arabic text normalization."""
@@ -163,53 +352,184 @@ class OptimizedArabicRetriever:
         # Normalize texts
         texts = [self.normalize_arabic_text(text) for text in texts]
         
-        embeddings = []
+        # Batches are written straight into one preallocated float32 array
+        embeddings = None
+        
+        def store(rows: np.ndarray, batch_embeddings: np.ndarray) -> None:
+            nonlocal embeddings
+            if embeddings is None:
+                embeddings = np.empty((len(texts), batch_embeddings.shape[1]), dtype=np.float32)
+            embeddings[rows] = batch_embeddings
+        
+        # Encode longest texts first so each batch holds similar lengths and
+        # little padding; rows are written back in the caller's order
+        order = np.argsort([-len(text) for text in texts], kind='stable')
+        batch_rows = [order[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
         
         # Create progress bar
         progress_desc = "🔍 Encoding queries" if is_query else "📝 Encoding passages"
-        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
         
         if show_progress:
-            pbar = tqdm(batches, desc=progress_desc)
+            pbar = tqdm(batch_rows, desc=progress_desc, disable=PROGRESS_DISABLE, mininterval=PROGRESS_MININTERVAL)
+        else:
+            pbar = batch_rows
+        
+        # Tokenize the next batch on a CPU thread while the model runs the current one
+        with ThreadPoolExecutor(max_workers=1) as tokenizer_worker, torch.inference_mode():
+            pending = None
+            for rows in pbar:
+                upcoming = tokenizer_worker.submit(self._tokenize_batch, [texts[i] for i in rows])
+                if pending is not None:
+                    store(pending_rows, self._embed_tokenized(pending.result()))
+                pending, pending_rows = upcoming, rows
+            if pending is not None:
+                store(pending_rows, self._embed_tokenized(pending.result()))
+        
+        return embeddings
+    
+    def _tokenize_batch(self, batch_texts: List[str]) -> Dict[str, torch.Tensor]:
+        """Tokenize one batch; on GPU the tensors are pinned so the copy can be asynchronous."""
+        inputs = self.tokenizer(
+            batch_texts,
+            padding='longest',  # pad to this batch's longest text, not to max_length
+            truncation=True,
+            max_length=512,
+            return_tensors="pt"
+        )
+        if self.device == "cuda":
+            inputs = {k: v.pin_memory() for k, v in inputs.items()}
+        return inputs
+    
+    def _embed_tokenized(self, inputs: Dict[str, torch.Tensor]) -> np.ndarray:
+        """Run the encoder on an already tokenized batch."""
+        # Move to device
+        inputs = {k: v.to(self.device, non_blocking=True) for k, v in inputs.items()}
+        
+        # Get embeddings
+        outputs = self.model(**inputs)
+        return self._pool_embeddings(outputs, inputs['attention_mask'])
+    
+    def find_max_batch_size(self, start: int = 256, limit: int = 4096) -> int:
+        """
+        Find the largest encoding batch size that fits in GPU memory.
+        
+        Probes full-length (512 token) batches, doubling from `start` until
+        CUDA runs out of memory, then binary-searches between the last size that
+        fit and the first that did not. Sets and returns self.batch_size.
+        Raises RuntimeError if not even a single sequence fits.
+        """
+        if self.device != "cuda":
+            return self.batch_size
+        
+        def fits(size: int) -> bool:
+            probe = {
+                'input_ids': torch.full((size, 512), self.tokenizer.unk_token_id or 0, dtype=torch.long),
+                'attention_mask': torch.ones((size, 512), dtype=torch.long)
+            }
+            try:
+                with torch.inference_mode():
+                    self._embed_tokenized(probe)
+                return True
+            except RuntimeError as e:
+                # torch.cuda.OutOfMemoryError (a RuntimeError) only exists in torch>=1.13
+                if "out of memory" not in str(e):
+                    raise
+                return False
+            finally:
+                torch.cuda.empty_cache()
+        
+        good, bad = 0, None
+        size = start
+        while size <= limit:
+            if not fits(size):
+                bad = size
+                break
+            good, size = size, size * 2
+        
+        if good == 0:
+            # Even `start` does not fit: search below it, starting from the floor
+            if not fits(1):
+                raise RuntimeError("Not enough GPU memory to encode a single 512-token sequence")
+            good, bad = 1, start
+        if bad is not None:
+            while bad - good > 1:
+                mid = (good + bad) // 2
+                if fits(mid):
+                    good = mid
+                else:
+                    bad = mid
+        
+        self.batch_size = good
+        print(f"🚀 Using encoding batch size {self.batch_size} on GPU")
+        return self.batch_size
+    
+    def _pool_embeddings(self, outputs, attention_mask: torch.Tensor) -> np.ndarray:
+        """Pool encoder outputs into one float32 vector per sequence."""
+        # Use [CLS] token or mean pooling
+        if hasattr(outputs, 'pooler_output') and outputs.pooler_output is not None:
+            batch_embeddings = outputs.pooler_output
         else:
-            pbar = batches
+            # Mean pooling
+            token_embeddings = outputs.last_hidden_state
+            input_mask_expanded = attention_mask.unsqueeze(-1).expand(token_embeddings.size()).float()
+            batch_embeddings = torch.sum(token_embeddings * input_mask_expanded, 1) / torch.clamp(input_mask_expanded.sum(1), min=1e-9)
         
+        # Convert to CPU and proper precision
+        return batch_embeddings.float().cpu().numpy()
+    
+    def build_query_embedding_table(self, batch_size: int = 512) -> np.ndarray:
+        """
+        Encode every vocabulary token once so queries can be embedded by lookup.
+        
+        Each token is run through the encoder on its own (wrapped in the
+        tokenizer's special tokens) and pooled exactly like a normal query. The table is
+        saved next to the FAISS index and has shape (vocab_size, dim).
+        """
+        vocab_size = len(self.tokenizer)
+        print(f"🧮 Building query embedding table for {vocab_size:,} tokens...")
+        
+        # [CLS] token [SEP] for BERT-style encoders such as AraDPR
+        prefix = [self.tokenizer.cls_token_id] if self.tokenizer.cls_token_id is not None else []
+        suffix = [self.tokenizer.sep_token_id] if self.tokenizer.sep_token_id is not None else []
+        
+        table = []
         with torch.no_grad():
-            for batch_texts in pbar:
-                # Tokenize batch
-                inputs = self.tokenizer(
-                    batch_texts,
-                    padding=True,
-                    truncation=True,
-                    max_length=512,
-                    return_tensors="pt"
+            for start in tqdm(range(0, vocab_size, batch_size), desc="🧮 Encoding vocabulary",
+                              disable=PROGRESS_DISABLE, mininterval=PROGRESS_MININTERVAL):
+                token_ids = range(start, min(start + batch_size, vocab_size))
+                input_ids = torch.tensor(
+                    [prefix + [token_id] + suffix for token_id in token_ids],
+                    device=self.device
                 )
-                
-                # Move to device
-                inputs = {k: v.to(self.device) for k, v in inputs.items()}
-                
-                # Get embeddings
-                outputs = self.model(**inputs)
-                
-                # Use [CLS] token or mean pooling
-                if hasattr(outputs, 'pooler_output') and outputs.pooler_output is not None:
-                    batch_embeddings = outputs.pooler_output
-                else:
-                    # Mean pooling
-                    attention_mask = inputs['attention_mask']
-                    token_embeddings = outputs.last_hidden_state
-                    input_mask_expanded = attention_mask.unsqueeze(-1).expand(token_embeddings.size()).float()
-                    batch_embeddings = torch.sum(token_embeddings * input_mask_expanded, 1) / torch.clamp(input_mask_expanded.sum(1), min=1e-9)
-                
-                # Convert to CPU and proper precision
-                if self.device == "cuda":
-                    batch_embeddings = batch_embeddings.float().cpu().numpy()
-                else:
-                    batch_embeddings = batch_embeddings.cpu().numpy()
-                
-                embeddings.extend(batch_embeddings)
+                attention_mask = torch.ones_like(input_ids)
+                outputs = self.model(input_ids=input_ids, attention_mask=attention_mask)
+                table.append(self._pool_embeddings(outputs, attention_mask))
+        
+        table = np.concatenate(table).astype(np.float32)
+        np.save(self.query_table_path, table)
+        print(f"💾 Saved query embedding table to {self.query_table_path}")
+        return table
+    
+    def load_query_embedding_table(self) -> None:
+        """Memory-map the query embedding table, building it first if missing."""
+        if os.path.exists(self.query_table_path):
+            self.query_table = np.load(self.query_table_path, mmap_mode='r')
+            if self.query_table.shape[0] == len(self.tokenizer):
+                print(f"📖 Loaded query embedding table with {self.query_table.shape[0]:,} tokens")
+                return
+            print("⚠️ Query embedding table does not match the tokenizer, rebuilding")
         
-        return np.array(embeddings)
+        self.build_query_embedding_table()
+        self.query_table = np.load(self.query_table_path, mmap_mode='r')
+    
+    def _encode_queries_fast(self, texts: List[str]) -> np.ndarray:
+        """Embed already-normalized queries as the mean of their token rows."""
+        token_ids = self.tokenizer(texts, add_special_tokens=False, truncation=True, max_length=512)['input_ids']
+        embeddings = np.zeros((len(texts), self.query_table.shape[1]), dtype=np.float32)
+        for i, ids in enumerate(token_ids):
+            if ids:
+                embeddings[i] = self.query_table[ids].mean(axis=0)
+        return embeddings
     
     def add_documents_incremental(self, documents: List[Dict[str, Any]], 
                                  background: bool = True, 
@@ -305,15 +625,21 @@ class OptimizedArabicRetriever:
             self.indexing_in_progress = True
         
         try:
+            pass_size = self.batch_size * INDEXING_BATCHES_PER_PASS
             while True:
                 with self.indexing_lock:
                     if not self.indexing_queue:
                         break
-                    
-                    # Process batch
-                    batch_size = min(50, len(self.indexing_queue))  # Process in batches
-                    batch = self.indexing_queue[:batch_size]
-                    self.indexing_queue = self.indexing_queue[batch_size:]
+                    waiting = len(self.indexing_queue) < pass_size
+                
+                # Give other uploads a moment to queue chunks for the same encoder batches
+                if waiting:
+                    time.sleep(INDEXING_WAIT)
+                
+                with self.indexing_lock:
+                    # Process batch (a whole number of encoder batches unless the queue runs out)
+                    batch = self.indexing_queue[:pass_size]
+                    self.indexing_queue = self.indexing_queue[pass_size:]
                 
                 print(f"🔄 Background indexing {len(batch)} documents...")
                 self._update_embeddings_incremental(batch)
@@ -330,31 +656,79 @@ class OptimizedArabicRetriever:
         
         print(f"🔧 Embedding {len(new_documents)} new documents...")
         
-        # Extract content for new documents
-        new_contents = [doc['content'] for doc in new_documents]
+        # A new trainable index (IVF/PQ/SQ) is trained on a sample of every new
+        # embedding, so it gets them in one group; otherwise pipeline the groups
+        needs_training = (self.index is None and self.index_factory) or (self.index is not None and not self.index.is_trained)
+        group_size = len(new_documents) if needs_training else INDEX_ADD_GROUP_SIZE
+        
+        # FAISS and torch both release the GIL, so inserting one group overlaps embedding the next
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="faiss-insert") as inserter:
+            pending = None
+            for start in range(0, len(new_documents), group_size):
+                group = new_documents[start:start + group_size]
+                embeddings = self._embed_documents(group)
+                if pending is not None:
+                    pending.result()
+                pending = inserter.submit(self._insert_embeddings, group, embeddings)
+            pending.result()
         
-        # Generate embeddings for new documents only
-        new_embeddings = self.encode_text_batch(new_contents, is_query=False, show_progress=True)
+        # Save index and metadata
+        self.save_index()
         
+        print(f"✅ Incrementally added {len(new_documents)} documents. Total: {self.index.ntotal}")
+    
+    def _embed_documents(self, documents: List[Dict[str, Any]]) -> np.ndarray:
+        """L2-normalized passage embeddings for documents (skipping ones cached on disk)."""
+        embeddings = self._encode_with_disk_cache(
+            [doc['content'] for doc in documents], 'passage',
+            lambda texts: self.encode_text_batch(texts, is_query=False, show_progress=True)
+        )
+        
+        # Normalize embeddings for cosine similarity
+        faiss.normalize_L2(embeddings)
+        return embeddings
+    
+    def _insert_embeddings(self, documents: List[Dict[str, Any]], embeddings: np.ndarray) -> None:
+        """Add embeddings of documents to the FAISS index, creating and training it if needed."""
         # Initialize index if needed
         if self.index is None:
-            dimension = new_embeddings.shape[1]
-            print(f"📊 Creating new FAISS index with dimension {dimension}")
-            self.index = faiss.IndexFlatIP(dimension)
-          # Normalize new embeddings for cosine similarity
-        faiss.normalize_L2(new_embeddings)
+            dimension = embeddings.shape[1]
+            if self.index_factory:
+                print(f"📊 Creating new FAISS index '{self.index_factory}' with dimension {dimension}")
+                base_index = faiss.index_factory(dimension, self.index_factory, faiss.METRIC_INNER_PRODUCT)
+            else:
+                print(f"📊 Creating new FAISS index with dimension {dimension}")
+                base_index = faiss.IndexFlatIP(dimension)
+            # Explicit ids = position in self.documents, independent of insertion order
+            self.index = faiss.IndexIDMap2(base_index)
+        
+        # Train quantizers (IVF/PQ) on a sample of the first batch
+        if not self.index.is_trained:
+            sample_size = min(self.train_sample_size, len(embeddings))
+            sample_ids = np.random.default_rng(0).choice(len(embeddings), size=sample_size, replace=False)
+            print(f"🎯 Training FAISS index on {sample_size:,} embeddings...")
+            self.index.train(embeddings[np.sort(sample_ids)])
+            self._configure_index()
         
         # Add only new embeddings to index
-        self.index.add(new_embeddings.astype(np.float32))
+        if isinstance(self.index, faiss.IndexIDMap2):
+            positions = np.fromiter((self.id_to_doc[doc['id']] for doc in documents),
+                                    dtype=np.int64, count=len(documents))
+            self.index.add_with_ids(embeddings, positions)
+        else:
+            # Indexes saved before the id map was introduced use sequential ids
+            self.index.add(embeddings)
         
         # Cache embeddings by hash
-        for doc, embedding in zip(new_documents, new_embeddings):
+        for doc, embedding in zip(documents, embeddings):
             self.embeddings_cache[doc['hash']] = embedding
-        
-        # Save index and metadata
-        self.save_index()
-        
-        print(f"✅ Incrementally added {len(new_documents)} documents. Total: {self.index.ntotal}")
+    
+    def _configure_index(self) -> None:
+        """Apply search-time parameters to IVF indexes."""
+        try:
+            faiss.extract_index_ivf(self.index).nprobe = self.nprobe
+        except RuntimeError:
+            pass  # Not an IVF index (e.g. IndexFlatIP); nothing to tune
     
     def get_indexing_status(self) -> Dict[str, Any]:
         """Get current indexing status."""
@@ -366,8 +740,82 @@ class OptimizedArabicRetriever:
                 'indexed_documents': self.index.ntotal if self.index else 0
             }
     
-    def retrieve(self, query: str, top_k: Optional[int] = None) -> List[RetrievedDocument]:
-        """Fast document retrieval with optimized query processing."""
+    def encode_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Encode queries in one batch, reusing cached embeddings for repeats.
+        
+        Args:
+            queries: Query texts
+            
+        Returns:
+            L2-normalized float32 array of shape (len(queries), dim)
+        """
+        # Cache key is the normalized text, which is exactly what gets encoded
+        keys = [self.normalize_arabic_text(query) for query in queries]
+        missing = [key for key in dict.fromkeys(keys) if key not in self.query_cache]
+        
+        if missing:
+            if self.query_table is not None:
+                embeddings = self._encode_with_disk_cache(missing, 'query-fast', self._encode_queries_fast)
+            else:
+                embeddings = self._encode_with_disk_cache(
+                    missing, 'query',
+                    lambda texts: self.encode_text_batch(texts, is_query=True, show_progress=False)
+                )
+            faiss.normalize_L2(embeddings)
+            for key, embedding in zip(missing, embeddings):
+                self.query_cache[key] = embedding
+        
+        for key in keys:
+            self.query_cache.move_to_end(key)
+        query_embeddings = np.stack([self.query_cache[key] for key in keys])
+        
+        # Evict least recently used queries
+        while len(self.query_cache) > self.query_cache_size:
+            self.query_cache.popitem(last=False)
+        
+        return query_embeddings
+    
+    def _encode_with_disk_cache(self, texts: List[str], kind: str, encode) -> np.ndarray:
+        """
+        Encode texts with `encode`, reusing embeddings from the persistent cache.
+        
+        Keys are SHA256 hashes of model name, kind and normalized text, so
+        switching models never returns stale vectors.
+        
+        Returns:
+            float32 array of shape (len(texts), dim)
+        """
+        if self.embedding_cache is None:
+            return np.asarray(encode(texts), dtype=np.float32)
+        
+        keys = [
+            hashlib.sha256(f"{self.model_name}|{kind}|{self.normalize_arabic_text(text)}".encode('utf-8')).hexdigest()
+            for text in texts
+        ]
+        with self.embedding_cache_lock:
+            stored = self.embedding_cache.get_many(list(dict.fromkeys(keys)))
+        cached = [stored.get(key) for key in keys]
+        
+        # Report reuse for passage batches only; queries arrive one request at a time
+        missing = [i for i, value in enumerate(cached) if value is None]
+        if kind == 'passage':
+            print(f"💾 Embedding cache: {len(texts) - len(missing)} reused, {len(missing)} to encode")
+        
+        if missing:
+            encoded = np.asarray(encode([texts[i] for i in missing]), dtype=np.float32)
+            for i, embedding in zip(missing, encoded):
+                cached[i] = embedding
+            with self.embedding_cache_lock:
+                self.embedding_cache.put_many([(keys[i], embedding.tobytes()) for i, embedding in zip(missing, encoded)])
+        
+        return np.stack([
+            np.frombuffer(value, dtype=np.float32) if isinstance(value, bytes) else value
+            for value in cached
+        ])
+    
+    def retrieve_batch(self, queries: List[str], top_k: Optional[int] = None) -> List[List[RetrievedDocument]]:
+        """Retrieve documents for several queries with one encode call and one index search."""
         if self.index is None:
             raise ValueError("No index available. Please add documents first.")
         
@@ -377,28 +825,36 @@ class OptimizedArabicRetriever:
         # Ensure we don't retrieve more than available
         top_k = min(top_k, len(self.documents))
         
-        # Fast query encoding
-        query_embedding = self.encode_text_batch([query], is_query=True, show_progress=False)
-          # Normalize for cosine similarity
-        faiss.normalize_L2(query_embedding)
+        if not queries:
+            return []
         
-        # Search
-        scores, indices = self.index.search(query_embedding.astype(np.float32), k=top_k)
+        # Batched, cached query encoding (already normalized for cosine similarity)
+        query_embeddings = self.encode_queries(queries)
+        
+        # Search all queries at once
+        scores, indices = self.index.search(query_embeddings, k=top_k)
         
         # Format results
-        results = []
-        for score, idx in zip(scores[0], indices[0]):
-            if idx != -1:  # Valid result
-                doc = self.documents[idx]
-                results.append(RetrievedDocument(
-                    content=doc['content'],
-                    meta=doc['meta'],
-                    score=float(score),
-                    doc_id=doc['id'],
-                    chunk_id=doc.get('chunk_id', 0)
-                ))
-        
-        return results
+        batch_results = []
+        for query_scores, query_indices in zip(scores, indices):
+            results = []
+            for score, idx in zip(query_scores, query_indices):
+                if idx != -1:  # Valid result
+                    doc = self.documents[idx]
+                    results.append(RetrievedDocument(
+                        content=doc['content'],
+                        meta=doc['meta'],
+                        score=float(score),
+                        doc_id=doc['id'],
+                        chunk_id=doc.get('chunk_id', 0)
+                    ))
+            batch_results.append(results)
+        
+        return batch_results
+    
+    def retrieve(self, query: str, top_k: Optional[int] = None) -> List[RetrievedDocument]:
+        """Fast document retrieval with optimized query processing."""
+        return self.retrieve_batch([query], top_k=top_k)[0]
     
     def save_index(self) -> None:
         """Save optimized index with caching."""
@@ -407,19 +863,25 @@ class OptimizedArabicRetriever:
         if self.index is not None:
             faiss.write_index(self.index, f"{self.index_path}.faiss")
         
-        # Save metadata with cache info
+        # Documents go to Parquet shards; only shards touched since the last
+        # save are rewritten (self.documents is append-only between saves)
+        shards_dir = shard_directory(self.documents_path)
+        saved_dir, saved_list, saved_count = self._saved_documents
+        start = saved_count if (saved_dir == shards_dir and saved_list is self.documents) else 0
+        write_document_shards(self.documents, shards_dir, start)
+        self._saved_documents = (shards_dir, self.documents, len(self.documents))
+        
+        # Small header; id_to_doc and hashes are rebuilt from the documents on load
         metadata = {
             'model_name': self.model_name,
-            'documents': self.documents,
-            'id_to_doc': self.id_to_doc,
-            'document_hashes': list(self.document_hashes),
+            'documents_dir': os.path.basename(shards_dir),
             'total_documents': len(self.documents),
             'batch_size': self.batch_size,
             'device': self.device
         }
         
-        with open(self.documents_path, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        with open(self.documents_path, 'wb') as f:
+            f.write(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
     
     def load_index(self) -> bool:
         """Load optimized index with caching."""
@@ -427,16 +889,24 @@ class OptimizedArabicRetriever:
             # Load FAISS index
             if os.path.exists(f"{self.index_path}.faiss"):
                 self.index = faiss.read_index(f"{self.index_path}.faiss")
+                self._configure_index()
                 print(f"📖 Loaded FAISS index with {self.index.ntotal} documents")
             
             # Load metadata
             if os.path.exists(self.documents_path):
-                with open(self.documents_path, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
+                with open(self.documents_path, 'rb') as f:
+                    metadata = orjson.loads(f.read())
+                
+                if 'documents' in metadata:
+                    # Legacy single-file format; the next save migrates it to shards
+                    self.documents = metadata['documents']
+                else:
+                    self.documents = list(iter_documents(self.documents_path))
+                    self._saved_documents = (shard_directory(self.documents_path), self.documents, len(self.documents))
                 
-                self.documents = metadata.get('documents', [])
-                self.id_to_doc = metadata.get('id_to_doc', {})
-                self.document_hashes = set(metadata.get('document_hashes', []))
+                self.id_to_doc = {doc['id']: position for position, doc in enumerate(self.documents)}
+                self.document_hashes = {doc['hash'] for doc in self.documents if 'hash' in doc}
+                self.document_hashes.update(metadata.get('document_hashes', []))
                 
                 # Check if model changed
                 saved_model = metadata.get('model_name', '')
@@ -462,6 +932,8 @@ class OptimizedArabicRetriever:
             'device': self.device,
             'batch_size': self.batch_size,
             'cached_embeddings': len(self.embeddings_cache),
+            'cached_queries': len(self.query_cache),
+            'fast_query': self.query_table is not None,
             'indexing_status': indexing_status,
             'index_path': self.index_path
         }
@@ -3,12 +3,13 @@ Simplified HTML Ingestion Module for ARQA
 Enhanced with PyArabic for better Arabic text normalization
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Iterator, Optional
 import os
 import re
 import json
 from pathlib import Path
 import unicodedata
+import orjson
 from bs4 import BeautifulSoup
 import pyarabic.araby as araby
 
@@ -120,11 +121,12 @@ class SimpleDocumentIngestor:
               Returns:
             List of tokens
         """
-        # Use PyArabic's tokenizer for better Arabic handling
-        tokens = araby.tokenize(text)
+        # Split with PyArabic's precompiled token patterns (same as araby.tokenize),
+        # cleaning each token once instead of calling sub()/strip() repeatedly
+        tokens = (araby.TOKEN_REPLACE.sub('', token).strip() for token in araby.TOKEN_PATTERN.split(text))
         
         # Filter out empty tokens and very short tokens
-        tokens = [token.strip() for token in tokens if token.strip() and len(token.strip()) > 1]
+        tokens = [token for token in tokens if len(token) > 1]
         
         return tokens
 
@@ -255,19 +257,32 @@ class SimpleDocumentIngestor:
         
         return all_documents
     
-    def save_documents(self, documents: List[Dict[str, Any]]) -> None:
+    def save_documents(self, documents: Iterable[Dict[str, Any]]) -> int:
         """
         💾 Save processed documents to JSON file.
         
+        Documents are written one at a time, so a generator of chunks can be
+        saved without first collecting it into a list.
+        
         Args:
-            documents: List of processed documents
+            documents: Iterable of processed documents
+            
+        Returns:
+            Number of documents saved
         """
         output_file = self.output_dir / "processed_documents.json"
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(documents, f, ensure_ascii=False, indent=2)
-        
-        print(f"💾 Saved {len(documents)} documents to {output_file}")
+        count = 0
+        
+        with open(output_file, 'wb') as f:
+            f.write(b'[')
+            for doc in documents:
+                f.write(b',\n' if count else b'\n')
+                f.write(orjson.dumps(doc))  # compact: see README for pretty-printing
+                count += 1
+            f.write(b'\n]')
+        
+        print(f"💾 Saved {count} documents to {output_file}")
+        return count
     
     def get_statistics(self) -> Dict[str, Any]:
         """📈 Get processing statistics."""
@@ -439,6 +454,65 @@ class SimpleDocumentIngestor:
             print(f"❌ Error processing XML content: {e}")
             return []
     
+    def chunk_text(self, title: str, text: str, source_url: str = "uploaded_file") -> Iterator[Dict[str, Any]]:
+        """
+        ✂️ Yield document chunks for already extracted title and body text.
+        
+        Only one document's chunks are held in memory, so callers can write
+        them out as they are produced.
+        
+        Args:
+            title: Document title
+            text: Clean body text
+            source_url: Source identifier for the content
+            
+        Yields:
+            Processed document chunks
+        """
+        # 🔤 Keep original text for non-normalized answers, title first as in XML extraction
+        original_text = f"{title} {text}" if title else text
+        chunks = self.chunk_text_by_tokens(original_text)
+        
+        for i, chunk in enumerate(chunks):
+            yield {
+                'content': chunk,
+                'metadata': {
+                    'title': title or "Untitled Document",
+                    'text_length': len(original_text),
+                    'file_type': 'text',
+                    'source_file': source_url,
+                    'filename': source_url,
+                    'chunk_id': i,
+                    'total_chunks': len(chunks),
+                    'chunk_length': len(chunk.split())
+                }
+            }
+    
+    def process_structured_content(self, title: str, text: str, source_url: str = "uploaded_file",
+                                   verbose: bool = True) -> List[Dict[str, Any]]:
+        """
+        📄 Process already extracted title and body text (e.g. Wikipedia articles).
+        
+        Args:
+            title: Document title
+            text: Clean body text
+            source_url: Source identifier for the content
+            verbose: Print a line per document (off for bulk imports)
+            
+        Returns:
+            List of processed document chunks
+        """
+        try:
+            documents = list(self.chunk_text(title, text, source_url))
+            
+            if verbose:
+                print(f"✅ Processed content: {len(documents)} chunks")
+            return documents
+            
+        except Exception as e:
+            print(f"❌ Error processing content: {e}")
+            return []
+    
     def process_xml_file(self, file_path: str) -> List[Dict[str, Any]]:
         """
         📄 Process a single XML file.
@@ -0,0 +1,58 @@
+"""
+Upload Handling Shared by the ARQA APIs
+Decodes uploaded files and parses them on a process pool that the API
+starts and stops with the application.
+"""
+
+import os
+import io
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional
+
+# Parsing is CPU-bound Python (BeautifulSoup + normalization), so uploads are
+# parsed in worker processes rather than threads that would contend for the GIL
+_parse_pool: Optional[ProcessPoolExecutor] = None
+
+
+def parse_pool_size() -> int:
+    """Cores per server process: run_api.py may start ARQA_WORKERS servers, each with its own pool."""
+    return max(1, (os.cpu_count() or 1) // int(os.environ.get("ARQA_WORKERS", "1")))
+
+
+def start_parse_pool() -> None:
+    """Create the parse pool (call from the API's startup event)."""
+    global _parse_pool
+    if _parse_pool is None:
+        # Spawned, not forked: the server process already runs model and tokenizer threads
+        _parse_pool = ProcessPoolExecutor(max_workers=parse_pool_size(),
+                                          mp_context=multiprocessing.get_context('spawn'))
+
+
+def shutdown_parse_pool() -> None:
+    """Stop the parse pool's worker processes (call from the API's shutdown event)."""
+    global _parse_pool
+    if _parse_pool is not None:
+        _parse_pool.shutdown(wait=True, cancel_futures=True)
+        _parse_pool = None
+
+
+def read_upload_text(upload) -> str:
+    """Decode an uploaded file as UTF-8 without closing it."""
+    reader = io.TextIOWrapper(upload, encoding='utf-8')
+    try:
+        return reader.read()
+    finally:
+        reader.detach()
+
+
+async def parse_upload(ingestor, filename: str, content: str) -> List[Dict[str, Any]]:
+    """Parse an uploaded HTML or XML file into chunks on the parse pool."""
+    if filename.endswith('.xml'):
+        parse = ingestor.process_xml_content
+    else:
+        parse = ingestor.process_html_content
+
+    start_parse_pool()  # No-op once the startup event has run
+    return await asyncio.get_running_loop().run_in_executor(_parse_pool, parse, content, filename)
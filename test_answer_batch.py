@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test SimpleArabicQA.answer_batch with QA dicts and RetrievedDocument objects
+"""
+
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from arqa.reader_simple import SimpleArabicQA
+from arqa.retriever_optimized_fixed import RetrievedDocument
+
+class FakeQAPipeline:
+    """Stands in for the transformers pipeline: answers with the first word of each context"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, question, context, batch_size):
+        self.calls.append((list(question), list(context)))
+        results = []
+        for text in context:
+            end = text.find(' ')
+            results.append({'answer': text[:end], 'score': 0.9 if 'صحيح' in text else 0.001,
+                            'start': 0, 'end': end})
+        # Like the real pipeline, a single pair comes back as a dict
+        return results[0] if len(results) == 1 else results
+
+def make_qa():
+    """SimpleArabicQA with the fake pipeline instead of a downloaded model"""
+    qa = SimpleArabicQA.__new__(SimpleArabicQA)
+    qa.model_name = 'fake'
+    qa.qa_pipeline = FakeQAPipeline()
+    return qa
+
+DOCUMENTS = [
+    ('doc_a', 'القاهرة صحيح عاصمة مصر', {'title': 'القاهرة', 'url': 'https://ar.wikipedia.org/wiki/القاهرة'}, 0.8),
+    ('doc_b', 'الرياض نص غير مفيد', {'title': 'الرياض'}, 0.6),
+    ('doc_c', 'دمشق صحيح أقدم العواصم', {'title': 'دمشق'}, 0.2),
+]
+
+def as_dicts():
+    return [{'id': doc_id, 'content': content, 'metadata': meta, 'score': score}
+            for doc_id, content, meta, score in DOCUMENTS]
+
+def as_retrieved_documents():
+    return [RetrievedDocument(content=content, meta=meta, score=score, doc_id=doc_id)
+            for doc_id, content, meta, score in DOCUMENTS]
+
+def test_dict_and_retrieved_document_inputs():
+    """Both document formats give the same answers from one batched pipeline call"""
+    print("🧪 Testing answer_batch input formats")
+
+    questions = ['ما هي عاصمة مصر؟', 'ما هي أقدم عاصمة؟']
+    qa = make_qa()
+    from_dicts = qa.answer_batch(questions, [as_dicts(), as_dicts()], top_k=2)
+    from_objects = make_qa().answer_batch(questions, [as_retrieved_documents(), as_retrieved_documents()], top_k=2)
+
+    assert len(qa.qa_pipeline.calls) == 1
+    assert len(qa.qa_pipeline.calls[0][0]) == 6
+    print("   ✅ All 6 (question, document) pairs in one pipeline call")
+
+    assert from_dicts == from_objects
+    print("   ✅ Dicts and RetrievedDocument objects give identical answers")
+
+    answers = from_dicts[0]
+    assert [a['document_id'] for a in answers] == ['doc_a', 'doc_c']
+    assert answers[0]['answer'] == 'القاهرة'
+    assert answers[0]['document_title'] == 'القاهرة'
+    assert answers[0]['document_url'].startswith('https://')
+    assert abs(answers[0]['combined_score'] - (0.9 * 0.7 + 0.8 * 0.3)) < 1e-9
+    print("   ✅ Low-confidence answers dropped, the rest ranked by combined score")
+
+def test_single_pair_and_empty_inputs():
+    """A single pair (returned as a dict) and blank questions/contexts are handled"""
+    print("🧪 Testing answer_batch edge cases")
+
+    qa = make_qa()
+    answers = qa.answer_batch(['سؤال؟'], [as_retrieved_documents()[:1]], combine_scores=False)
+    assert len(answers) == 1 and answers[0][0]['combined_score'] == 0.9
+    print("   ✅ Single pair answered")
+
+    qa = make_qa()
+    blank_doc = {'id': 'blank', 'content': '   ', 'metadata': {}, 'score': 1.0}
+    answers = qa.answer_batch(['', 'سؤال؟'], [as_dicts(), [blank_doc]])
+    assert answers == [[], []]
+    assert qa.qa_pipeline.calls == []
+    print("   ✅ Blank question and blank context skip the pipeline")
+
+if __name__ == "__main__":
+    test_dict_and_retrieved_document_inputs()
+    test_single_pair_and_empty_inputs()
+    print("\n🎉 answer_batch tests complete!")
@@ -22,16 +22,22 @@ def load_wikipedia_data(data_dir: str = "wikipedia_test") -> List[Dict[str, Any]
         return []
     
     all_chunks = []
-    batch_files = [f for f in os.listdir(data_dir) if f.startswith('wikipedia_batch_') and f.endswith('.json')]
-    batch_files.sort()
+    # scandir: one directory read with cached file types, and full paths without joining
+    with os.scandir(data_dir) as entries:
+        batch_files = sorted(
+            (entry.name, entry.path) for entry in entries
+            if entry.name.startswith('wikipedia_batch') and entry.name.endswith(('.json', '.jsonl')) and entry.is_file()
+        )
     
     print(f"📦 Found {len(batch_files)} batch files")
     
-    for batch_file in batch_files:
-        batch_path = os.path.join(data_dir, batch_file)
-          try:
+    for batch_file, batch_path in batch_files:
+        try:
             with open(batch_path, 'r', encoding='utf-8') as f:
-                batch_data = json.load(f)
+                if batch_file.endswith('.jsonl'):
+                    batch_data = [json.loads(line) for line in f if line.strip()]
+                else:
+                    batch_data = json.load(f)
                 # Data is already a list of chunks, not a dict with 'chunks' key
                 if isinstance(batch_data, list):
                     chunks = batch_data
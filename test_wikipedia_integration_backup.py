@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test that the Wikipedia integration scripts leave a restorable backup
+"""
+
+import sys
+import os
+import tempfile
+
+import orjson
+
+sys.path.append(os.path.dirname(__file__))
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from arqa.document_store import (
+    write_document_shards, iter_documents, count_documents, move_documents, shard_directory
+)
+
+ORIGINAL_IDS = [f'doc_{i}' for i in range(5)]
+
+def make_corpus(tmp):
+    """A retriever-saved store plus one processed Wikipedia batch in tmp"""
+    documents_path = os.path.join(tmp, 'documents_metadata.json')
+    documents = [{'id': doc_id, 'content': f'محتوى {doc_id}', 'meta': {'title': doc_id}, 'chunk_id': 0}
+                 for doc_id in ORIGINAL_IDS]
+    with open(documents_path, 'wb') as f:
+        f.write(orjson.dumps({'model_name': 'm', 'documents_dir': 'documents_metadata', 'total_documents': 5}))
+    write_document_shards(documents, shard_directory(documents_path))
+
+    os.makedirs(os.path.join(tmp, 'wikipedia_test'))
+    with open(os.path.join(tmp, 'wikipedia_test', 'wikipedia_batch.jsonl'), 'wb') as f:
+        for i in range(3):
+            chunk = {'content': f'مقالة ويكيبيديا {i}', 'metadata': {'title': f'مقالة {i}', 'chunk_id': 0, 'total_chunks': 1}}
+            f.write(orjson.dumps(chunk) + b'\n')
+    return documents_path
+
+def find_backup(tmp):
+    """The single backup header an integration run created"""
+    backups = [name for name in os.listdir(tmp) if '.backup_' in name and not name.endswith('_documents')]
+    assert len(backups) == 1, backups
+    return os.path.join(tmp, backups[0])
+
+def check_restore(tmp, documents_path):
+    """The merged store holds 8 documents; restoring the backup brings back the original 5"""
+    assert count_documents(documents_path) == 8
+
+    backup_file = find_backup(tmp)
+    assert [doc['id'] for doc in iter_documents(backup_file)] == ORIGINAL_IDS
+    print(f"   ✅ Backup readable: {os.path.basename(backup_file)}")
+
+    move_documents(backup_file, documents_path)
+    assert [doc['id'] for doc in iter_documents(documents_path)] == ORIGINAL_IDS
+    print("   ✅ Restored the original documents from the backup")
+
+def test_simple_integration_backup():
+    """simple_wikipedia_integration.py backs up the shards it replaces"""
+    print("🧪 Testing simple_wikipedia_integration backup")
+
+    import simple_wikipedia_integration
+
+    cwd, argv = os.getcwd(), sys.argv
+    with tempfile.TemporaryDirectory() as tmp:
+        documents_path = make_corpus(tmp)
+        try:
+            os.chdir(tmp)
+            sys.argv = ['simple_wikipedia_integration.py', '--yes']
+            simple_wikipedia_integration.main()
+        finally:
+            os.chdir(cwd)
+            sys.argv = argv
+        check_restore(tmp, documents_path)
+
+def test_add_wikipedia_backup():
+    """add_wikipedia_to_metadata.merge_and_save_metadata backs up the shards it replaces"""
+    print("🧪 Testing add_wikipedia_to_metadata backup")
+
+    from add_wikipedia_to_metadata import (
+        load_existing_metadata, iter_wikipedia_chunks, convert_wikipedia_to_metadata_format, merge_and_save_metadata
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        documents_path = make_corpus(tmp)
+        existing_data = load_existing_metadata(documents_path)
+        new_documents = convert_wikipedia_to_metadata_format(
+            iter_wikipedia_chunks(os.path.join(tmp, 'wikipedia_test')), start_id=5)
+        assert merge_and_save_metadata(existing_data, new_documents, output_file=documents_path) == 3
+        check_restore(tmp, documents_path)
+
+if __name__ == "__main__":
+    test_simple_integration_backup()
+    test_add_wikipedia_backup()
+    print("\n🎉 Integration backup tests complete!")
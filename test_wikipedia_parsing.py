@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test the raw Wikipedia dump parsing helpers in process_wikipedia.py
+"""
+
+import sys
+import os
+import bz2
+import tempfile
+
+sys.path.append(os.path.dirname(__file__))
+
+from process_wikipedia import (
+    WikipediaProcessor, split_pages, strip_templates, is_article_candidate, MIN_ARTICLE_LENGTH
+)
+
+ARTICLE_TEXT = 'القاهرة هي عاصمة جمهورية مصر العربية وأكبر مدنها. ' * 5
+
+def make_page(text, ns='0', title='القاهرة', redirect=False):
+    """A raw <page> element as it appears in the dump"""
+    redirect_tag = f'<redirect title="{title}" />' if redirect else ''
+    return (
+        f'<page><title>{title}</title><ns>{ns}</ns>{redirect_tag}'
+        f'<revision><text xml:space="preserve">{text}</text></revision></page>'
+    ).encode('utf-8')
+
+def test_split_pages():
+    """Pages are cut out whole, even when they span chunk boundaries"""
+    print("🧪 Testing split_pages")
+
+    pages = [make_page(ARTICLE_TEXT, title=f'مقالة {i}') for i in range(3)]
+    stream = b'<mediawiki><siteinfo>...</siteinfo>' + b'\n'.join(pages) + b'</mediawiki>'
+
+    # Every chunk size, including ones that split '<page>' and '</page>'
+    for chunk_size in (1, 3, 7, 64, len(stream)):
+        chunks = [stream[i:i + chunk_size] for i in range(0, len(stream), chunk_size)]
+        assert list(split_pages(chunks)) == pages, f"chunk size {chunk_size}"
+    print("   ✅ Same pages for every chunk size")
+
+    assert list(split_pages([b'<page><title>x</title>'])) == []
+    print("   ✅ Unterminated trailing page is not yielded")
+
+def test_strip_templates():
+    """Templates are removed, including nested ones"""
+    print("🧪 Testing strip_templates")
+
+    assert strip_templates('بدون قوالب') == 'بدون قوالب'
+    assert strip_templates('أ{{قالب}}ب') == 'أب'
+    assert strip_templates('أ{{خارجي|{{داخلي|{{أعمق}}}}}}ب{{آخر}}ج') == 'أبج'
+    assert strip_templates('نص }} عادي') == 'نص }} عادي'
+    print("   ✅ Flat, nested and stray-brace cases")
+
+    assert strip_templates('أ{{مفتوح|{{مغلق}}') == 'أ{{مفتوح|{{مغلق}}'
+    print("   ✅ Unterminated template is left in place")
+
+def test_is_article_candidate():
+    """Only main-namespace, non-redirect, non-disambiguation pages of sufficient length pass"""
+    print("🧪 Testing is_article_candidate")
+
+    assert is_article_candidate(make_page(ARTICLE_TEXT))
+    print("   ✅ Regular article accepted")
+
+    rejected = {
+        'other namespace': make_page(ARTICLE_TEXT, ns='14'),
+        'redirect tag': make_page(ARTICLE_TEXT, redirect=True),
+        'redirect text': make_page('#تحويل [[القاهرة]] ' + ARTICLE_TEXT),
+        'disambiguation': make_page(ARTICLE_TEXT + '{{توضيح}}'),
+        'too short': make_page('ق' * (MIN_ARTICLE_LENGTH // 2 - 1)),
+        'empty text': make_page('').replace(b'<text xml:space="preserve"></text>', b'<text xml:space="preserve" />'),
+    }
+    for reason, page in rejected.items():
+        assert not is_article_candidate(page), reason
+        print(f"   ✅ Rejected: {reason}")
+
+def test_malformed_page_is_skipped():
+    """A page lxml cannot parse is counted as skipped and the dump keeps going"""
+    print("🧪 Testing iter_raw_pages with a malformed page")
+
+    broken = make_page(ARTICLE_TEXT + '<unclosed>', title='مكسورة')
+    pages = [make_page(ARTICLE_TEXT, title='الأولى'), broken, make_page(ARTICLE_TEXT, title='الأخيرة')]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dump_file = os.path.join(tmp, 'dump.xml.bz2')
+        with bz2.open(dump_file, 'wb') as f:
+            f.write(b'<mediawiki>' + b''.join(pages) + b'</mediawiki>')
+
+        processor = WikipediaProcessor(output_dir=os.path.join(tmp, 'out'), quiet=True)
+        titles = [title for title, _ in processor.iter_raw_pages(dump_file)]
+
+    assert titles == ['الأولى', 'الأخيرة']
+    assert processor.stats['articles_skipped'] == 1
+    print("   ✅ Malformed page skipped, later pages still read")
+
+if __name__ == "__main__":
+    test_split_pages()
+    test_strip_templates()
+    test_is_article_candidate()
+    test_malformed_page_is_skipped()
+    print("\n🎉 Wikipedia parsing tests complete!")